@@ -1,28 +1,246 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
 import httpx
-from typing import Tuple, Dict, Any, List
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Tuple, Dict, Any, List, Optional
+from app.clients.resilience import CircuitBreaker, RetryableError, with_retries
 from app.core.config import settings
+from app.core.metrics import upstream_fetch_bytes, upstream_fetch_duration
+from app.utils.encoding import dumps
+
+logger = logging.getLogger(__name__)
 
 class ExternalClientError(Exception):
     pass
 
-async def fetch_countries_and_rates() -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
-    timeout = httpx.Timeout(settings.EXTERNAL_TIMEOUT)
-    async with httpx.AsyncClient(timeout=timeout) as client:
+COUNTRIES_SOURCE = "restcountries"
+RATES_SOURCE = "open.er-api"
+
+@dataclass
+class _CachedPayload:
+    """Last successful body for a URL plus the validators to revalidate it."""
+    data: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: Optional[datetime] = None
+
+_client: Optional[httpx.AsyncClient] = None
+_payload_cache: Dict[str, _CachedPayload] = {}
+_disk_checked: set = set()
+_breakers: Dict[str, CircuitBreaker] = {}
+# source -> fetched_at of the last-known-good copy currently being served instead
+_serving_stale: Dict[str, Optional[datetime]] = {}
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.EXTERNAL_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.EXTERNAL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.EXTERNAL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.EXTERNAL_KEEPALIVE_EXPIRY,
+        ),
+        http2=settings.EXTERNAL_HTTP2 and _http2_available(),
+    )
+
+def get_client() -> httpx.AsyncClient:
+    """Shared pooled client; created lazily if the app lifespan hasn't started it."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+async def start_client() -> None:
+    get_client()
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def _get_json(client: httpx.AsyncClient, url: str, source: str) -> Tuple[Any, bool]:
+    """
+    GET a JSON document, revalidating with ETag/Last-Modified when we have a
+    prior copy. Returns (data, changed). Transport errors, timeouts, 5xx,
+    408 and 429 raise RetryableError; anything else raises ExternalClientError.
+    """
+    cached = _payload_cache.get(url)
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    start = time.perf_counter()
+    try:
+        resp = await client.get(url, headers=headers)
+    except httpx.HTTPError as e:
+        upstream_fetch_duration.observe(time.perf_counter() - start, source, "error")
+        raise RetryableError(f"{type(e).__name__}: {e}") from e
+    upstream_fetch_duration.observe(time.perf_counter() - start, source, str(resp.status_code))
+    upstream_fetch_bytes.inc(len(resp.content), source)
+
+    now = datetime.now(timezone.utc)
+    if resp.status_code == 304 and cached is not None:
+        cached.fetched_at = now
+        return cached.data, False
+    if resp.status_code >= 500 or resp.status_code in (408, 429):
+        raise RetryableError(f"HTTP {resp.status_code}")
+    if resp.status_code != 200:
+        raise ExternalClientError(f"HTTP {resp.status_code}")
+    try:
+        data = resp.json()
+    except ValueError:
+        raise ExternalClientError("invalid JSON body")
+
+    _payload_cache[url] = _CachedPayload(
+        data=data,
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+        fetched_at=now,
+    )
+    return data, True
+
+def _breaker(source: str) -> CircuitBreaker:
+    breaker = _breakers.get(source)
+    if breaker is None:
+        breaker = _breakers[source] = CircuitBreaker(
+            source, settings.EXTERNAL_BREAKER_THRESHOLD, settings.EXTERNAL_BREAKER_RESET_SECONDS
+        )
+    return breaker
+
+def _fallback_path(source: str) -> Path:
+    return Path(settings.EXTERNAL_FALLBACK_DIR) / f"{source}.json"
+
+def _persist_last_known_good(source: str, url: str, payload: _CachedPayload) -> None:
+    path = _fallback_path(source)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = {
+        "url": url,
+        "etag": payload.etag,
+        "last_modified": payload.last_modified,
+        "fetched_at": payload.fetched_at.isoformat() if payload.fetched_at else None,
+        "data": payload.data,
+    }
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dumps(doc))
+        os.replace(tmp, path)
+    except BaseException:
         try:
-            countries_resp = await client.get(settings.EXTERNAL_COUNTRIES_URL)
-            countries_resp.raise_for_status()
-        except Exception as e:
-            raise ExternalClientError(f"Could not fetch data from restcountries")
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def _load_last_known_good(source: str, url: str) -> Optional[_CachedPayload]:
+    try:
+        with open(_fallback_path(source), "rb") as f:
+            doc = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(doc, dict) or doc.get("url") != url or "data" not in doc:
+        return None
+    fetched_at = doc.get("fetched_at")
+    return _CachedPayload(
+        data=doc["data"],
+        etag=doc.get("etag"),
+        last_modified=doc.get("last_modified"),
+        fetched_at=datetime.fromisoformat(fetched_at) if fetched_at else None,
+    )
+
+async def _fetch_upstream(client: httpx.AsyncClient, url: str, source: str) -> Tuple[Any, bool]:
+    """
+    Fetch one upstream through its circuit breaker with jittered retries,
+    bounded by EXTERNAL_RETRY_DEADLINE. On failure (or while the breaker is
+    open) serve the last-known-good payload, from memory or disk, and report
+    it as stale. Returns (data, stale).
+    """
+    if url not in _payload_cache and url not in _disk_checked:
+        # After a restart, seed from disk so we can revalidate and fall back
+        _disk_checked.add(url)
+        loaded = await asyncio.to_thread(_load_last_known_good, source, url)
+        if loaded is not None:
+            _payload_cache.setdefault(url, loaded)
 
+    breaker = _breaker(source)
+    if breaker.allow():
         try:
-            rates_resp = await client.get(settings.EXTERNAL_RATES_URL)
-            rates_resp.raise_for_status()
-        except Exception as e:
-            raise ExternalClientError(f"Could not fetch data from open.er-api")
-
-    countries = countries_resp.json()
-    rates_payload = rates_resp.json()
-    rates_map = rates_payload.get("rates") or {}
+            data, changed = await asyncio.wait_for(
+                with_retries(
+                    lambda: _get_json(client, url, source),
+                    attempts=max(1, settings.EXTERNAL_RETRY_ATTEMPTS),
+                    base_delay=settings.EXTERNAL_RETRY_BASE_DELAY,
+                    max_delay=settings.EXTERNAL_RETRY_MAX_DELAY,
+                ),
+                timeout=settings.EXTERNAL_RETRY_DEADLINE,
+            )
+        # wait_for raises asyncio.TimeoutError, only an alias of the builtin from 3.11 on
+        except (RetryableError, ExternalClientError, asyncio.TimeoutError, TimeoutError) as e:
+            breaker.record_failure(str(e) or type(e).__name__)
+            logger.warning("upstream %s failed: %s (breaker %s)", source, e, breaker.state)
+        except asyncio.CancelledError:
+            breaker.record_failure("cancelled")
+            raise
+        else:
+            breaker.record_success()
+            _serving_stale.pop(source, None)
+            if changed:
+                try:
+                    await asyncio.to_thread(_persist_last_known_good, source, url, _payload_cache[url])
+                except OSError:
+                    logger.exception("could not persist last-known-good payload for %s", source)
+            return data, False
+
+    cached = _payload_cache.get(url)
+    if cached is None:
+        raise ExternalClientError(f"Could not fetch data from {source}")
+    _serving_stale[source] = cached.fetched_at
+    return cached.data, True
+
+def _sources() -> List[Tuple[str, str]]:
+    return [
+        (COUNTRIES_SOURCE, settings.EXTERNAL_COUNTRIES_URL),
+        (RATES_SOURCE, settings.EXTERNAL_RATES_URL),
+    ]
+
+def upstream_status() -> Dict[str, Dict[str, Any]]:
+    """Breaker and fallback state per upstream, for /status."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for source, url in _sources():
+        cached = _payload_cache.get(url)
+        out[source] = {
+            **_breaker(source).snapshot(),
+            "serving_stale": source in _serving_stale,
+            "fallback_available": cached is not None or _fallback_path(source).exists(),
+            "fallback_fetched_at": cached.fetched_at if cached is not None else None,
+        }
+    return out
+
+async def fetch_countries_and_rates() -> Tuple[List[Dict[str, Any]], Dict[str, float], List[str]]:
+    """Returns (countries, rates, stale_sources); stale_sources lists upstreams served from fallback."""
+    client = get_client()
+    (countries, countries_stale), (rates_payload, rates_stale) = await asyncio.gather(
+        *(_fetch_upstream(client, url, source) for source, url in _sources())
+    )
+    stale_sources = [source for (source, _), stale in zip(_sources(), (countries_stale, rates_stale)) if stale]
+
+    rates_map = rates_payload.get("rates") if isinstance(rates_payload, dict) else None
     if not isinstance(rates_map, dict):
         rates_map = {}
 
@@ -36,4 +254,4 @@ async def fetch_countries_and_rates() -> Tuple[List[Dict[str, Any]], Dict[str, f
     if not isinstance(countries, list):
         countries = []
 
-    return countries, rates
+    return countries, rates, stale_sources
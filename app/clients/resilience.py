@@ -0,0 +1,81 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker: after `failure_threshold` consecutive
+    failures it opens and rejects calls for `reset_timeout` seconds, then
+    lets a single trial call through (half-open) to decide whether to close.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_success_at: Optional[datetime] = None
+        self.last_failure_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - (self.opened_at or 0) >= self.reset_timeout:
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self.last_success_at = datetime.now(timezone.utc)
+
+    def record_failure(self, error: str) -> None:
+        self.failures += 1
+        self.last_failure_at = datetime.now(timezone.utc)
+        self.last_error = error
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "last_success_at": self.last_success_at,
+            "last_failure_at": self.last_failure_at,
+            "last_error": self.last_error,
+        }
+
+class RetryableError(Exception):
+    """Wraps failures worth another attempt (network errors, 5xx, 408, 429)."""
+
+async def with_retries(
+    fn: Callable[[], Awaitable[T]],
+    attempts: int,
+    base_delay: float,
+    max_delay: float,
+) -> T:
+    """Call `fn` up to `attempts` times with full-jitter exponential backoff on RetryableError."""
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except RetryableError:
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+    raise AssertionError("unreachable")
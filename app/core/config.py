@@ -6,9 +6,79 @@ class Settings(BaseSettings):
     PORT: int = Field(default=8012)
 
     DATABASE_URL: str = Field(default="sqlite:///./data.db")
+    # Async mode: routes and refresh use an AsyncEngine (aiosqlite/asyncmy/asyncpg)
+    DB_ASYNC: bool = Field(default=False)
+    ASYNC_DATABASE_URL: str | None = Field(default=None)
+    DB_POOL_SIZE: int = Field(default=5)
+    DB_MAX_OVERFLOW: int = Field(default=10)
+    DB_POOL_RECYCLE: int = Field(default=1800)
+    DB_POOL_TIMEOUT: float = Field(default=30)
     EXTERNAL_COUNTRIES_URL: str = Field(default="https://restcountries.com/v2/all?fields=name,capital,region,population,flag,currencies")
     EXTERNAL_RATES_URL: str = Field(default="https://open.er-api.com/v6/latest/USD")
     EXTERNAL_TIMEOUT: int = Field(default=10)
+    EXTERNAL_MAX_CONNECTIONS: int = Field(default=10)
+    EXTERNAL_MAX_KEEPALIVE: int = Field(default=5)
+    EXTERNAL_KEEPALIVE_EXPIRY: float = Field(default=300.0)
+    EXTERNAL_HTTP2: bool = Field(default=True)
+
+    # Upstream resilience: retries, circuit breaker, last-known-good fallback
+    EXTERNAL_RETRY_ATTEMPTS: int = Field(default=3)
+    EXTERNAL_RETRY_BASE_DELAY: float = Field(default=0.5)
+    EXTERNAL_RETRY_MAX_DELAY: float = Field(default=4.0)
+    EXTERNAL_RETRY_DEADLINE: float = Field(default=25.0)  # total budget per upstream, seconds
+    EXTERNAL_BREAKER_THRESHOLD: int = Field(default=3)
+    EXTERNAL_BREAKER_RESET_SECONDS: float = Field(default=60.0)
+    EXTERNAL_FALLBACK_DIR: str = Field(default="cache/upstream")
+
+    # Background refresh; interval <= 0 disables the scheduler
+    REFRESH_INTERVAL_SECONDS: float = Field(default=0)
+    REFRESH_JITTER_SECONDS: float = Field(default=30)
+    REFRESH_JOB_HISTORY: int = Field(default=50)
+    # Delete countries that no longer appear upstream
+    REFRESH_PRUNE_STALE: bool = Field(default=False)
+    # Seed for the GDP multiplier generator (unset = fresh randomness per refresh)
+    REFRESH_GDP_SEED: int | None = Field(default=None)
+
+    # History snapshots: full resolution for N days, then one per country per day,
+    # then dropped after SNAPSHOT_MAX_RETENTION_DAYS (each country's latest is kept)
+    SNAPSHOTS_ENABLED: bool = Field(default=True)
+    SNAPSHOT_FULL_RETENTION_DAYS: int = Field(default=30)
+    # Snapshots one refresh expires / compacts at most
+    SNAPSHOT_COMPACTION_BATCH_SIZE: int = Field(default=50000)
+    SNAPSHOT_MAX_RETENTION_DAYS: int = Field(default=365)  # 0 = keep forever
+
+    # In-process cache of encoded GET /countries responses
+    CACHE_MAX_ENTRIES: int = Field(default=512)
+    CACHE_TTL_SECONDS: float = Field(default=300)
+
+    # Precompressed (gzip, br when brotli is installed) variants of cached bodies
+    COMPRESSION_ENABLED: bool = Field(default=True)
+    COMPRESSION_MIN_BYTES: int = Field(default=1024)
+    COMPRESSION_MIN_SAVINGS: float = Field(default=0.1)  # keep a variant only if it is this much smaller
+    COMPRESSION_GZIP_LEVEL: int = Field(default=6)
+    COMPRESSION_BROTLI_QUALITY: int = Field(default=8)
+    COMPRESSION_CACHE_MAX_ENTRIES: int = Field(default=1024)
+    COMPRESSION_PRECOMPUTE: bool = Field(default=True)  # encode full/per-region/per-currency lists after refresh
+
+    # HTTP validators (ETag / Last-Modified) for read endpoints
+    HTTP_CACHE_MAX_AGE: int = Field(default=0)
+    HTTP_VALIDATORS_TTL_SECONDS: float = Field(default=1.0)
+
+    # Shared mmap snapshot of the countries table for multi-worker hosts
+    SHARED_SNAPSHOT_ENABLED: bool = Field(default=False)
+    SHARED_SNAPSHOT_PATH: str = Field(default="cache/countries.snap")
+
+    # Startup warm-up: pre-open DB connections and prime caches by replaying these GETs
+    WARMUP_ENABLED: bool = Field(default=True)
+    WARMUP_DB_CONNECTIONS: int = Field(default=2)
+    WARMUP_PATHS: list[str] = Field(default=[
+        "/status", "/countries", "/countries/stats", "/countries/search?q=a", "/countries/image",
+    ])
+    WARMUP_TIMEOUT_SECONDS: float = Field(default=5.0)
+
+    # Observability: /metrics; opt-in Server-Timing headers and per-request profiling (X-Profile: 1)
+    METRICS_ENABLED: bool = Field(default=True)
+    METRICS_PROFILING_ENABLED: bool = Field(default=False)
 
     class Config:
         env_file = ".env"
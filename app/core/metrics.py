@@ -0,0 +1,270 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in items]
+
+class Gauge(_Metric):
+    """Sampled at scrape time from a callback returning {label_values: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Dict[Tuple[str, ...], float]], labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._fn = fn
+
+    def render(self) -> List[str]:
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in self._fn().items()]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """(count, sum) per label set."""
+        with self._lock:
+            return {k: (sum(counts), total) for k, (counts, total) in self._series.items()}
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(counts), total) for k, (counts, total) in self._series.items()]
+        lines = self.header()
+        for k, counts, total in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, None), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound is None else f'le="{_fmt(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, k, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, k)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, k)} {cumulative}")
+        return lines
+
+registry: List[_Metric] = []
+
+def render_metrics() -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- instruments -----------------------------------------------------------
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template and status.",
+    ("method", "route", "status"),
+)
+db_query_duration = Histogram("db_query_duration_seconds", "Time spent executing DB statements.")
+db_queries_per_request = Histogram(
+    "db_queries_per_request", "DB statements executed per HTTP request.",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+refresh_phase_duration = Histogram(
+    "refresh_phase_duration_seconds", "Refresh time by phase (fetch, transform, write, index, snapshot, summary, image).",
+    ("phase",),
+)
+upstream_fetch_duration = Histogram(
+    "upstream_fetch_duration_seconds", "Upstream HTTP request latency by outcome.",
+    ("source", "outcome"),
+)
+upstream_fetch_bytes = Counter("upstream_fetch_bytes_total", "Upstream response body bytes received.", ("source",))
+
+# --- per-request DB accounting -----------------------------------------------
+
+# [statement count, seconds]; a mutable cell so threadpool/greenlet work is counted too
+_request_db: ContextVar[Optional[List[float]]] = ContextVar("request_db", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    db_query_duration.observe(elapsed)
+    cell = _request_db.get()
+    if cell is not None:
+        cell[0] += 1
+        cell[1] += elapsed
+
+def instrument_engine(sync_engine) -> None:
+    """Attach statement timing and pool checkout-wait timing to an Engine."""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+    # Pool events fire only after a checkout completes, so time the blocking get itself.
+    # _do_get is private: only wrap the QueuePool family (incl. the async adapter),
+    # the one pool that can make a checkout wait; other pools go untimed.
+    pool = sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    do_get = pool._do_get
+
+    def _timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start)
+
+    pool._do_get = _timed_do_get
+
+# --- ASGI middleware -------------------------------------------------------------
+
+_profiling = threading.Lock()
+
+def _profile_text(profiler: cProfile.Profile, status: int) -> bytes:
+    out = io.StringIO()
+    out.write(f"# profiled response status: {status}\n")
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+    return out.getvalue().encode()
+
+class MetricsMiddleware:
+    """
+    Records request latency per route template and DB statements per
+    request. With METRICS_PROFILING_ENABLED, responses also carry a
+    Server-Timing header, and a request carrying `X-Profile: 1` gets a
+    cProfile summary (event-loop thread only) as a text/plain body instead
+    of its normal response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        cell = [0, 0.0]
+        token = _request_db.set(cell)
+        start = time.perf_counter()
+        status = 500
+        profiler = None
+        profiling = settings.METRICS_PROFILING_ENABLED
+        if profiling and (b"x-profile", b"1") in scope.get("headers", ()):
+            if _profiling.acquire(blocking=False):
+                profiler = cProfile.Profile()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profiling:
+                    timing = (
+                        f"db;dur={cell[1] * 1000:.2f};desc=\"{cell[0]} queries\", "
+                        f"app;dur={(time.perf_counter() - start) * 1000:.2f}"
+                    )
+                    message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            if profiler is None:
+                await self.app(scope, receive, send_wrapper)
+            else:
+                status = await self._profiled(scope, receive, send, profiler)
+        finally:
+            _request_db.reset(token)
+            if profiler is not None:
+                _profiling.release()
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                scope["method"], getattr(route, "path", "unmatched"), str(status),
+            )
+            db_queries_per_request.observe(cell[0])
+
+    async def _profiled(self, scope, receive, send, profiler: cProfile.Profile) -> int:
+        captured = {"status": 500}
+
+        async def swallow(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+
+        profiler.enable()
+        try:
+            await self.app(scope, receive, swallow)
+        finally:
+            profiler.disable()
+        body = _profile_text(profiler, captured["status"])
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+        return captured["status"]
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class StartupReport:
+    """How long this process took to import and to warm up, step by step."""
+    import_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    steps: Dict[str, float] = field(default_factory=dict)
+    primed: Dict[str, int] = field(default_factory=dict)   # path -> status code
+    errors: Dict[str, str] = field(default_factory=dict)
+    ready_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "import_seconds": self.import_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "steps": self.steps,
+            "primed": self.primed,
+            "errors": self.errors,
+            "ready_at": self.ready_at.strftime("%Y-%m-%dT%H:%M:%SZ") if self.ready_at else None,
+        }
+
+startup_report = StartupReport()
+
+def _phases() -> Dict[tuple, float]:
+    out = {(name,): seconds for name, seconds in startup_report.steps.items()}
+    if startup_report.import_seconds is not None:
+        out[("import",)] = startup_report.import_seconds
+    if startup_report.warmup_seconds is not None:
+        out[("warmup_total",)] = startup_report.warmup_seconds
+    return out
+
+Gauge("app_startup_seconds", "Process startup time by phase.", _phases, ("phase",))
+
+async def _step(name: str, fn: Callable[[], Awaitable[Any]], required: bool = False) -> None:
+    start = time.perf_counter()
+    try:
+        await fn()
+    except Exception as e:
+        if required:
+            raise
+        startup_report.errors[name] = f"{type(e).__name__}: {e}"
+        logger.warning("warm-up step %s failed: %s", name, e)
+    finally:
+        startup_report.steps[name] = time.perf_counter() - start
+
+async def _prime(app) -> None:
+    """Replay WARMUP_PATHS through the app so response caches, validators and indexes are filled."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+        for path in settings.WARMUP_PATHS:
+            resp = await client.get(path)
+            startup_report.primed[path] = resp.status_code
+
+async def warm_up(app) -> None:
+    """
+    Lifespan startup: start the upstream client, publish the shared snapshot
+    and, with WARMUP_ENABLED, pre-open DB connections and prime caches
+    within WARMUP_TIMEOUT_SECONDS. Optional steps never block startup on failure.
+    """
+    # Imported here so importing this module stays cheap
+    from app.clients.external import start_client
+    from app.db import warm_pool
+    from app.services.shared_snapshot import ensure_published
+
+    start = time.perf_counter()
+    await _step("http_client", start_client, required=True)
+    if settings.WARMUP_ENABLED:
+        await _step("db_pool", lambda: warm_pool(settings.WARMUP_DB_CONNECTIONS))
+    await _step("shared_snapshot", ensure_published)
+    if settings.WARMUP_ENABLED and settings.WARMUP_PATHS:
+        await _step("caches", lambda: asyncio.wait_for(_prime(app), settings.WARMUP_TIMEOUT_SECONDS))
+    startup_report.warmup_seconds = time.perf_counter() - start
+    startup_report.ready_at = datetime.now(timezone.utc)
+    logger.info(
+        "startup: import %.3fs, warm-up %.3fs (%s)",
+        startup_report.import_seconds or 0.0,
+        startup_report.warmup_seconds,
+        ", ".join(f"{k}={v * 1e3:.0f}ms" for k, v in startup_report.steps.items()),
+    )
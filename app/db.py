@@ -1,20 +1,38 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, List, Sequence, TypeVar, Union
+
+from sqlalchemy import Executable, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from app.core.config import settings
+from app.core.metrics import Gauge, instrument_engine
 
 DB_URL = settings.DATABASE_URL
 is_sqlite = DB_URL.startswith("sqlite")
 
 connect_args = {"check_same_thread": False} if is_sqlite else {}
 
+# SQLite keeps SQLAlchemy's default pool; sizing only applies to server databases
+pool_args = {} if is_sqlite else {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+}
+
 engine = create_engine(
     DB_URL,
     echo=False,
     future=True,
     pool_pre_ping=True,
     connect_args=connect_args,
+    **pool_args,
 )
 
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+
 # Session factory
 SessionLocal = sessionmaker(
     bind=engine,
@@ -25,9 +43,114 @@ SessionLocal = sessionmaker(
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+asyncmy",
+    "mysql+pymysql": "mysql+asyncmy",
+    "mysql+mysqldb": "mysql+asyncmy",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its asyncio driver."""
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    async_engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL or async_url(DB_URL),
+        echo=False,
+        pool_pre_ping=True,
+        **pool_args,
+    )
+    if settings.METRICS_ENABLED:
+        instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+def _pool_checked_out():
+    pool = (async_engine.sync_engine if async_engine is not None else engine).pool
+    return {(): pool.checkedout()} if hasattr(pool, "checkedout") else {}
+
+Gauge("db_pool_checked_out", "Connections currently checked out of the pool.", _pool_checked_out)
+
+DbSession = Union[Session, AsyncSession]
+T = TypeVar("T")
+
+@asynccontextmanager
+async def session_scope():
+    """An AsyncSession in async mode, otherwise a plain Session."""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+async def run_sync(db: DbSession, fn: Callable[..., T], *args: Any) -> T:
+    """
+    Run `fn(session, *args)` without blocking the event loop: on the
+    AsyncSession's greenlet bridge in async mode, in the threadpool otherwise.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+def _partitions_sync(statements: Sequence[Executable], batch_size: int) -> Iterator[List[Any]]:
+    with SessionLocal() as db:
+        for stmt in statements:
+            result = db.execute(stmt.execution_options(yield_per=batch_size))
+            for part in result.partitions():
+                yield part
+
+async def stream_partitions(statements: Sequence[Executable], batch_size: int = 500) -> AsyncIterator[List[Any]]:
+    """
+    Rows of each statement in turn, `batch_size` at a time, on a dedicated
+    session and a server-side cursor (yield_per) so memory stays flat.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            for stmt in statements:
+                result = await db.stream(stmt.execution_options(yield_per=batch_size))
+                async for part in result.partitions():
+                    yield part
+    else:
+        async for part in iterate_in_threadpool(_partitions_sync(statements, batch_size)):
+            yield part
+
+def _open_connections(n: int) -> None:
+    conns = [engine.connect() for _ in range(n)]
     try:
-        yield db
+        for conn in conns:
+            conn.exec_driver_sql("SELECT 1")
     finally:
-        db.close()
+        for conn in conns:
+            conn.close()
+
+async def warm_pool(connections: int) -> None:
+    """Open (and return to the pool) `connections` connections so first requests skip the connect."""
+    if connections <= 0:
+        return
+    if async_engine is not None:
+        conns = [await async_engine.connect() for _ in range(connections)]
+        try:
+            for conn in conns:
+                await conn.exec_driver_sql("SELECT 1")
+        finally:
+            for conn in conns:
+                await conn.close()
+    else:
+        await run_in_threadpool(_open_connections, connections)
+
+async def get_db():
+    async with session_scope() as db:
+        yield db
@@ -1,41 +1,64 @@
-from fastapi import FastAPI, Depends
-from fastapi.exceptions import RequestValidationError
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func
-from starlette.exceptions import HTTPException as StarletteHTTPException
-
-from app.core import errors as err_handlers
-from app.db import get_db
-from app.models.country import Country
-from app.models.meta import MetaCache
-from app.routers.countries import router as countries_router
-from app.schemas.status import StatusOut
-
-
-app = FastAPI(
-    title="HNG Stage 2 - Country Currency & Exchange API",
-    version="1.0",
-)
-
-# error handlers
-app.add_exception_handler(RequestValidationError, err_handlers.handle_validation_error)
-app.add_exception_handler(StarletteHTTPException, err_handlers.handle_http_exception)
-app.add_exception_handler(Exception, err_handlers.handle_unexpected_error)
-
-# routers
-app.include_router(countries_router)
-
-@app.get("/", tags=["meta"])
-async def root():
-    return {"service": "stage2-api", "version": "1.0"}
-
-@app.get("/healthz", tags=["meta"])
-async def healthz():
-    return {"status": "ok"}
-
-@app.get("/status", response_model=StatusOut, tags=["meta"])
-async def status(db: Session = Depends(get_db)):
-    total = db.scalar(select(func.count()).select_from(Country)) or 0
-    meta = db.scalar(select(MetaCache).where(MetaCache.id == 1))
-    last_ts = meta.last_refreshed_at if meta else None
-    return StatusOut(total_countries=total, last_refreshed_at=last_ts)
+import time
+
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager  # noqa: E402
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.exceptions import RequestValidationError  # noqa: E402
+from starlette.exceptions import HTTPException as StarletteHTTPException  # noqa: E402
+
+from app.clients.external import close_client  # noqa: E402
+from app.core import errors as err_handlers  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.metrics import MetricsMiddleware  # noqa: E402
+from app.core.startup import startup_report, warm_up  # noqa: E402
+from app.routers.convert import router as convert_router  # noqa: E402
+from app.routers.countries import router as countries_router  # noqa: E402
+from app.routers.meta import router as meta_router  # noqa: E402
+from app.services.scheduler import refresh_coordinator  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up(app)
+    refresh_coordinator.start()
+    try:
+        yield
+    finally:
+        await refresh_coordinator.stop()
+        await close_client()
+
+def create_app() -> FastAPI:
+    """
+    Build the ASGI app. Entry points: `uvicorn app.main:app` (built on first
+    access) or `uvicorn --factory app.main:create_app`; either builds it once.
+    """
+    app = FastAPI(
+        title="HNG Stage 2 - Country Currency & Exchange API",
+        version="1.0",
+        lifespan=lifespan,
+    )
+
+    # error handlers
+    app.add_exception_handler(RequestValidationError, err_handlers.handle_validation_error)
+    app.add_exception_handler(StarletteHTTPException, err_handlers.handle_http_exception)
+    app.add_exception_handler(Exception, err_handlers.handle_unexpected_error)
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    # routers
+    app.include_router(meta_router)
+    app.include_router(countries_router)
+    app.include_router(convert_router)
+    return app
+
+def __getattr__(name: str):
+    # Module-level `app`, built lazily so the --factory entry point doesn't build a second one
+    if name == "app":
+        globals()["app"] = instance = create_app()
+        return instance
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+startup_report.import_seconds = time.perf_counter() - _import_started
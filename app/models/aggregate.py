@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, BigInteger, Float, DateTime, JSON, UniqueConstraint
+from app.db import Base
+
+class CountryAggregate(Base):
+    """Per-region / per-currency (and global, group_by="all") rollups, rebuilt on data changes."""
+    __tablename__ = "country_aggregates"
+    __table_args__ = (
+        UniqueConstraint("group_by", "group_key", name="ux_country_aggregates_group"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    group_by = Column(String(16), nullable=False)       # region | currency | all
+    group_key = Column(String(64), nullable=False)      # normalized key; "" for none / "all"
+    label = Column(String(64), nullable=True)           # display value (region / currency_code)
+
+    count = Column(Integer, nullable=False)
+    total_population = Column(BigInteger, nullable=False)
+    gdp_count = Column(Integer, nullable=False)
+    gdp_sum = Column(Float, nullable=False)
+    gdp_avg = Column(Float, nullable=True)
+    gdp_max = Column(Float, nullable=True)
+    top = Column(JSON, nullable=False)                  # [[name, estimated_gdp], ...] by GDP desc
+
+    updated_at = Column(DateTime(timezone=True), nullable=False)
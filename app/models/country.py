@@ -1,10 +1,18 @@
-from sqlalchemy import Column, Integer, String, BigInteger, Float, DateTime
+from sqlalchemy import Column, Integer, String, BigInteger, Float, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.db import Base
 
 class Country(Base):
     __tablename__ = "countries"
+    __table_args__ = (
+        # list_countries filter + sort paths
+        Index("ix_countries_region_key_gdp", "region_key", "estimated_gdp"),
+        Index("ix_countries_currency_key_gdp", "currency_key", "estimated_gdp"),
+        Index("ix_countries_region_key_name_key", "region_key", "name_key"),
+        Index("ix_countries_currency_key_name_key", "currency_key", "name_key"),
+        Index("ix_countries_estimated_gdp", "estimated_gdp"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -12,11 +20,14 @@ class Country(Base):
     name_key: Mapped[str] = mapped_column(String(512), nullable=False, index=True, unique=True)
     capital = Column(String(191), nullable=True)
     region = Column(String(64), nullable=True)
+    region_key = Column(String(64), nullable=True)         # normalize_key(region)
     population = Column(BigInteger, nullable=False)
     currency_code = Column(String(16), nullable=True)       
+    currency_key = Column(String(16), nullable=True)        # normalize_key(currency_code)
     exchange_rate = Column(Float, nullable=True)            
     estimated_gdp = Column(Float, nullable=True)            
     flag_url = Column(String(512), nullable=True)
+    content_hash = Column(String(32), nullable=True)       # hash of the normalized upstream record
 
     last_refreshed_at = Column(DateTime(timezone=True), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, Float, DateTime
+from app.db import Base
+
+class ExchangeRate(Base):
+    """Latest open.er-api rates: units of `code` per one unit of `base` (USD)."""
+    __tablename__ = "exchange_rates"
+
+    code = Column(String(16), primary_key=True)
+    base = Column(String(16), nullable=False)
+    rate = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
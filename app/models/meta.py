@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy import Column, Integer, DateTime, text
 from app.db import Base
 
 class MetaCache(Base):
@@ -7,3 +7,8 @@ class MetaCache(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=False, default=1)
     last_refreshed_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped on every data change (refresh or delete); drives HTTP validators
+    generation = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    changed_at = Column(DateTime(timezone=True), nullable=True)
+    # Snapshots before this instant are already downsampled to one per country per day
+    snapshots_compacted_through = Column(DateTime(timezone=True), nullable=True)
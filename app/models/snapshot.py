@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, BigInteger, Boolean, Float, DateTime, ForeignKey, Index, false
+from app.db import Base
+
+class RefreshRun(Base):
+    """One row per refresh that wrote data; snapshots hang off it."""
+    __tablename__ = "refresh_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    inserted = Column(Integer, nullable=False, default=0)
+    changed = Column(Integer, nullable=False, default=0)
+
+class CountrySnapshot(Base):
+    """
+    Append-only history of country rows. A row is written for each country
+    a refresh inserted or changed or a batch patch rewrote, and a `deleted`
+    tombstone when a country is removed, so the state as of T is the latest
+    snapshot per country with captured_at <= T (absent if that one is a
+    tombstone).
+    """
+    __tablename__ = "country_snapshots"
+    __table_args__ = (
+        Index("ix_country_snapshots_country_captured", "country_id", "captured_at"),
+        Index("ix_country_snapshots_captured", "captured_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    refresh_id = Column(Integer, ForeignKey("refresh_runs.id", ondelete="CASCADE"), nullable=True)  # NULL outside refreshes (deletes, batch patches)
+    country_id = Column(Integer, nullable=False)
+    captured_at = Column(DateTime(timezone=True), nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False, server_default=false())
+    # Descriptive fields as captured; NULL only on rows of countries deleted before they were recorded
+    name = Column(String(191), nullable=True)
+    name_key = Column(String(512), nullable=True)
+    capital = Column(String(191), nullable=True)
+    region = Column(String(64), nullable=True)
+    region_key = Column(String(64), nullable=True)
+    flag_url = Column(String(512), nullable=True)
+    population = Column(BigInteger, nullable=False)
+    currency_code = Column(String(16), nullable=True)
+    exchange_rate = Column(Float, nullable=True)
+    estimated_gdp = Column(Float, nullable=True)
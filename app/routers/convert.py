@@ -0,0 +1,54 @@
+import math
+from typing import List, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+
+from app.db import DbSession, get_db
+from app.schemas.convert import ConvertBatchIn
+from app.services.rates import RATES_BASE, UnknownCurrency, rate_table
+from app.utils.encoding import dumps, format_utc
+
+router = APIRouter(prefix="/convert", tags=["convert"])
+
+async def _convert(db: DbSession, items: List[Tuple[str, str, float]], field: str) -> List[Tuple[float, float]]:
+    if not await rate_table.ensure_current(db):
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Exchange rates unavailable", "details": "No rates stored yet; run a refresh first"},
+        )
+    try:
+        return rate_table.convert_many(items)
+    except UnknownCurrency as e:
+        raise HTTPException(status_code=400, detail={"error": "Validation failed", "details": {field: str(e)}})
+
+def _item(f: str, t: str, amount: float, rate: float, result: float) -> dict:
+    return {"from": f.upper(), "to": t.upper(), "amount": amount, "rate": rate, "result": result}
+
+@router.get("")
+async def convert(
+    from_: str = Query(alias="from", min_length=1, max_length=16),
+    to: str = Query(min_length=1, max_length=16),
+    amount: float = Query(default=1.0),
+    db: DbSession = Depends(get_db),
+):
+    if not math.isfinite(amount):
+        raise HTTPException(status_code=400, detail={"error": "Validation failed", "details": {"amount": "must be finite"}})
+    ((rate, result),) = await _convert(db, [(from_, to, amount)], "currency")
+    body = {
+        **_item(from_, to, amount, rate, result),
+        "base": RATES_BASE,
+        "rates_updated_at": format_utc(rate_table.updated_at),
+    }
+    return Response(content=dumps(body), media_type="application/json")
+
+@router.post("")
+async def convert_batch(payload: ConvertBatchIn, db: DbSession = Depends(get_db)):
+    items = [(i.from_, i.to, i.amount) for i in payload.items]
+    converted = await _convert(db, items, "items")
+    body = {
+        "base": RATES_BASE,
+        "rates_updated_at": format_utc(rate_table.updated_at),
+        "results": [_item(f, t, amount, rate, result) for (f, t, amount), (rate, result) in zip(items, converted)],
+    }
+    return Response(content=dumps(body), media_type="application/json")
@@ -1,85 +1,377 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import FileResponse
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import Optional, Literal, List
+from datetime import datetime, timezone
+from typing import Optional, Literal, List, Tuple
 
-from app.db import get_db
+from app.core.config import settings
+from app.db import DbSession, get_db, run_sync
 from app.models.country import Country
+from app.schemas.batch import CountryBatchLookupIn, CountryBatchMutateIn
 from app.schemas.country import CountryOut
-from app.services.image import SUMMARY_PATH
-from app.services.refresh import run_refresh
+from app.schemas.stats import CountryStatsOut, TopCountryOut
+from app.services.aggregates import AGGREGATE_TOP_SIZE, load_aggregates, rebuild_aggregates
+from app.services.batch import MissingCountries, apply_batch, lookup_many
+from app.services.cache import country_cache, data_changed, variant_cache
+from app.services.compression import encoded_variant, expected_encoding, negotiate, variant_etag
+from app.services.export import export_stream
+from app.services.http_cache import cache_headers, is_not_modified, load_validators, make_etag, not_modified
+from app.services.image import get_summary_png
+from app.services.listing import (
+    COUNTRY_COLUMNS,
+    COUNTRY_KEYS,
+    MAX_PAGE_SIZE,
+    InvalidQuery,
+    decode_cursor,
+    list_cache_key,
+    parse_fields,
+    select_countries,
+    select_countries_as_of,
+)
+from app.services.meta import bump_generation
+from app.services.scheduler import RefreshJob, refresh_coordinator
+from app.services.search import load_search_rows, search_index
+from app.services.shared_snapshot import current_snapshot, publish_snapshot
+from app.services.snapshots import load_history, record_deletions
+from app.utils.encoding import dumps, rows_to_dicts
 from app.utils.text import normalize_key
 
 router = APIRouter(prefix="/countries", tags=["countries"])
 
+def _refresh_summary(result: dict) -> dict:
+    return {
+        "inserted": result["inserted"],
+        "updated": result["updated"],
+        "changed": result["changed"],
+        "unchanged": result["unchanged"],
+        "stale": result["stale"],
+        "pruned": result["pruned"],
+        "total": result["total"],
+        "last_refreshed_at": result["refreshed_at"].strftime("%Y-%m-%dT%H:%M:%SZ") if result["refreshed_at"] else None,
+        "served_stale": bool(result["stale_sources"]),
+        "stale_sources": result["stale_sources"],
+    }
+
+def _job_out(job: RefreshJob) -> dict:
+    out = {"job_id": job.id, "status": job.status}
+    if job.result is not None:
+        if job.result.get("ok"):
+            out["result"] = _refresh_summary(job.result)
+        else:
+            out["error"] = job.result.get("error")
+    return out
+
 @router.post("/refresh")
-async def refresh_countries(db: Session = Depends(get_db)):
-    result = await run_refresh(db)
+async def refresh_countries(wait: bool = Query(default=True)):
+    if not wait:
+        job = refresh_coordinator.submit()
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=_job_out(job))
+
+    result = await refresh_coordinator.run()
     if not result.get("ok"):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail={"error": "External data source unavailable", "details": result.get("error")},
         )
     # short summary
-    return {
-        "inserted": result["inserted"],
-        "updated": result["updated"],
-        "total": result["total"],
-        "last_refreshed_at": result["refreshed_at"].strftime("%Y-%m-%dT%H:%M:%SZ"),
-    }
+    return _refresh_summary(result)
+
+@router.get("/refresh/{job_id}")
+async def get_refresh_job(job_id: str):
+    job = refresh_coordinator.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail={"error": "Refresh job not found"})
+    return _job_out(job)
 
 @router.get("/image")
-async def get_summary_image():
-    if not SUMMARY_PATH.exists():
+async def get_summary_image(request: Request):
+    png = await get_summary_png()
+    if png is None:
         raise HTTPException(
             status_code=404,
             detail={"error": "Summary image not found"},
         )
-    return FileResponse(path=str(SUMMARY_PATH), media_type="image/png", filename="summary.png")
+    key = ("image", png.etag)
+    encoding = expected_encoding(key, negotiate(request.headers.get("accept-encoding")))
+    headers = _varied(cache_headers(variant_etag(png.etag, encoding), png.rendered_for))
+    if is_not_modified(request, headers["ETag"], png.rendered_for):
+        return not_modified(headers)
+
+    data, encoding = await encoded_variant(key, png.data, encoding, variant_cache.generation)
+    if encoding is None:
+        headers["ETag"] = png.etag
+    else:
+        headers["Content-Encoding"] = encoding
+    headers["Content-Disposition"] = 'attachment; filename="summary.png"'
+    return Response(content=data, media_type="image/png", headers=headers)
+
+def _varied(headers: dict) -> dict:
+    headers["Vary"] = "Accept-Encoding"
+    return headers
+
+def _json(body: bytes, headers: dict) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("", response_model=List[CountryOut])
-def list_countries(
+async def list_countries(
+    request: Request,
     region: Optional[str] = Query(default=None),
     currency: Optional[str] = Query(default=None),
     sort: Optional[Literal["gdp_desc", "gdp_asc", "name_asc", "name_desc"]] = Query(default=None),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+    as_of: Optional[datetime] = Query(default=None),
+    db: DbSession = Depends(get_db),
 ):
-    stmt = select(Country)
+    try:
+        keys = parse_fields(fields)
+        if cursor:
+            decode_cursor(cursor, sort)
+        if as_of is not None and (limit is not None or cursor):
+            raise InvalidQuery("as_of", "as_of cannot be combined with limit or cursor")
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail={"error": "Validation failed", "details": {e.field: str(e)}})
 
-    if region:
-        stmt = stmt.where(func.lower(Country.region) == region.lower())
+    region_key = normalize_key(region)
+    currency_key = normalize_key(currency)
+    cache_key = list_cache_key(region_key, currency_key, sort, keys, limit, cursor, as_of)
+    encoding = expected_encoding(cache_key, negotiate(request.headers.get("accept-encoding")))
+    v = await load_validators(db)
+    vgeneration = variant_cache.generation
+    etag = make_etag(v.generation, *cache_key)
+    headers = _varied(cache_headers(variant_etag(etag, encoding), v.changed_at))
+    if is_not_modified(request, headers["ETag"], v.changed_at):
+        return not_modified(headers)
 
-    if currency:
-        stmt = stmt.where(func.upper(Country.currency_code) == currency.upper())
+    cached = country_cache.get(cache_key)
+    if cached is not None:
+        body, next_cursor = cached
+    else:
+        generation = country_cache.generation
+        snapshot = current_snapshot(v.generation) if as_of is None else None
+        if as_of is not None:
+            rows = await run_sync(db, select_countries_as_of, as_of, region_key, currency_key, sort, keys)
+            next_cursor = None
+        elif snapshot is not None:
+            rows, next_cursor = snapshot.select(region_key, currency_key, sort, keys, limit, cursor)
+        else:
+            rows, next_cursor = await run_sync(db, select_countries, region_key, currency_key, sort, keys, limit, cursor)
+        body = dumps(rows_to_dicts(keys, rows))
+        country_cache.set(cache_key, (body, next_cursor), generation)
 
-    if sort:
-        if sort == "gdp_desc":
-            stmt = stmt.order_by(Country.estimated_gdp.is_(None), Country.estimated_gdp.desc())
-        elif sort == "gdp_asc":
-            stmt = stmt.order_by(Country.estimated_gdp.is_(None), Country.estimated_gdp.asc())
-        elif sort == "name_asc":
-            stmt = stmt.order_by(func.lower(Country.name).asc())
-        elif sort == "name_desc":
-            stmt = stmt.order_by(func.lower(Country.name).desc())
+    body, encoding = await encoded_variant(cache_key, body, encoding, vgeneration)
+    if encoding is None:
+        # Not worth compressing: this is the identity representation after all
+        headers["ETag"] = etag
+    else:
+        headers["Content-Encoding"] = encoding
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return _json(body, headers)
+
+def _stats_out(rows: list, top: int) -> List[dict]:
+    return [
+        CountryStatsOut(
+            group=r.label,
+            count=r.count,
+            total_population=r.total_population,
+            gdp_sum=r.gdp_sum,
+            gdp_avg=r.gdp_avg,
+            gdp_max=r.gdp_max,
+            top=[TopCountryOut(name=n, estimated_gdp=g) for n, g in r.top[:top]],
+        ).model_dump()
+        for r in rows
+    ]
+
+@router.get("/stats", response_model=List[CountryStatsOut])
+async def country_stats(
+    request: Request,
+    group_by: Literal["region", "currency"] = Query(default="region"),
+    top: int = Query(default=5, ge=0, le=AGGREGATE_TOP_SIZE),
+    db: DbSession = Depends(get_db),
+):
+    cache_key = ("stats", group_by, top)
+    v = await load_validators(db)
+    headers = cache_headers(make_etag(v.generation, *cache_key), v.changed_at)
+    if is_not_modified(request, headers["ETag"], v.changed_at):
+        return not_modified(headers)
 
-    rows = db.execute(stmt).scalars().all()
-    return [CountryOut.model_validate(r) for r in rows]
+    body = country_cache.get(cache_key)
+    if body is None:
+        generation = country_cache.generation
+        rows = await run_sync(db, load_aggregates, group_by)
+        body = dumps(_stats_out(rows, top))
+        country_cache.set(cache_key, body, generation)
+    return _json(body, headers)
+
+@router.get("/search")
+async def search_countries(
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50),
+    db: DbSession = Depends(get_db),
+):
+    v = await load_validators(db)
+    if not search_index.is_current(v.generation):
+        rows = await run_sync(db, load_search_rows)
+        search_index.rebuild(rows, v.generation)
+    return _json(dumps(search_index.search(q, limit)), {})
+
+_EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+@router.get("/export")
+async def export_countries(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    region: Optional[str] = Query(default=None),
+    currency: Optional[str] = Query(default=None),
+    sort: Optional[Literal["gdp_desc", "gdp_asc", "name_asc", "name_desc"]] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+):
+    try:
+        keys = parse_fields(fields)
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail={"error": "Validation failed", "details": {e.field: str(e)}})
+
+    # Streamed through zlib as it is produced, so gzip is the only coding on offer
+    gzip = negotiate(request.headers.get("accept-encoding"), ("gzip",)) == "gzip"
+    headers = {
+        "Content-Disposition": f'attachment; filename="countries.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_stream(format, normalize_key(region), normalize_key(currency), sort, keys, gzip=gzip),
+        media_type=_EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+@router.post("/batch")
+async def get_countries_batch(payload: CountryBatchLookupIn, db: DbSession = Depends(get_db)):
+    """Resolve many names at once: one IN query over name_key (or the shared snapshot)."""
+    requested = {name: normalize_key(name) for name in payload.names}
+    keys = list(dict.fromkeys(requested.values()))
+    v = await load_validators(db)
+    snapshot = current_snapshot(v.generation)
+    if snapshot is not None:
+        indices = {k: snapshot.find(k) for k in keys}
+        rows = {k: snapshot.row(i) for k, i in indices.items() if i is not None}
+    else:
+        rows = await run_sync(db, lookup_many, keys)
+
+    found = {name: rows[key] for name, key in requested.items() if key in rows}
+    body = {
+        "found": dict(zip(found, rows_to_dicts(COUNTRY_KEYS, found.values()))),
+        "missing": [name for name, key in requested.items() if key not in rows],
+    }
+    return _json(dumps(body), {})
+
+@router.patch("/batch")
+async def mutate_countries_batch(payload: CountryBatchMutateIn, db: DbSession = Depends(get_db)):
+    """Delete and patch many countries in a single transaction; all names must exist."""
+    updates = [u.model_dump(exclude_unset=True) for u in payload.update]
+    try:
+        result = await run_sync(db, apply_batch, payload.delete, updates)
+    except MissingCountries as e:
+        raise HTTPException(status_code=404, detail={"error": "Country not found", "details": {"missing": e.names}})
+
+    if result.generation is not None:
+        data_changed()
+        if search_index.generation is not None:
+            search_index.remove(result.deleted_ids, result.generation)
+            patched = await run_sync(db, load_search_rows, result.updated_ids) if result.updated_ids else []
+            search_index.upsert(patched, result.generation)
+        await run_sync(db, publish_snapshot)
+    return {"deleted": len(result.deleted_ids), "updated": len(result.updated_ids)}
 
 @router.get("/{name}", response_model=CountryOut)
-def get_country(name: str, db: Session = Depends(get_db)):
+async def get_country(name: str, request: Request, db: DbSession = Depends(get_db)):
     key = normalize_key(name)
-    row = db.scalar(select(Country).where(Country.name_key == key))
+    cache_key = ("one", key)
+    v = await load_validators(db)
+    headers = cache_headers(make_etag(v.generation, *cache_key), v.changed_at)
+    if is_not_modified(request, headers["ETag"], v.changed_at):
+        return not_modified(headers)
+
+    body = country_cache.get(cache_key)
+    if body is not None:
+        return _json(body, headers)
+    generation = country_cache.generation
+
+    snapshot = current_snapshot(v.generation)
+    if snapshot is not None:
+        index = snapshot.find(key)
+        row = snapshot.row(index) if index is not None else None
+    else:
+        stmt = select(*COUNTRY_COLUMNS).where(Country.name_key == key)
+        row = await run_sync(db, lambda s: s.execute(stmt).first())
     if not row:
         raise HTTPException(status_code=404, detail={"error": "Country not found"})
-    return CountryOut.model_validate(row)
+    body = dumps(rows_to_dicts(COUNTRY_KEYS, [row])[0])
+    country_cache.set(cache_key, body, generation)
+    return _json(body, headers)
 
-@router.delete("/{name}", status_code=204)
-def delete_country(name: str, db: Session = Depends(get_db)):
-    key = normalize_key(name)
+def _delete_by_key(db: Session, key: str) -> Optional[Tuple[int, int]]:
+    """Delete one country; returns (id, new generation), or None if it doesn't exist."""
     row = db.scalar(select(Country).where(Country.name_key == key))
     if not row:
-        raise HTTPException(status_code=404, detail={"error": "Country not found"})
+        return None
+    row_id = row.id
+    scope = {"region": [row.region_key], "currency": [row.currency_key]}
+    if settings.SNAPSHOTS_ENABLED:
+        record_deletions(db, [row_id], datetime.now(timezone.utc))
     db.delete(row)
+    db.flush()
+    rebuild_aggregates(db, scope)
+    meta = bump_generation(db)
     db.commit()
+    return row_id, meta.generation
+
+def _history(db: Session, key: str, start: Optional[datetime], end: Optional[datetime]) -> Optional[list]:
+    country_id = db.scalar(select(Country.id).where(Country.name_key == key))
+    if country_id is None:
+        return None
+    return load_history(db, country_id, start, end)
+
+@router.get("/{name}/history")
+async def get_country_history(
+    name: str,
+    request: Request,
+    start: Optional[datetime] = Query(default=None, alias="from"),
+    end: Optional[datetime] = Query(default=None, alias="to"),
+    db: DbSession = Depends(get_db),
+):
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail={"error": "Validation failed", "details": {"from": "must not be after 'to'"}})
+
+    key = normalize_key(name)
+    cache_key = ("history", key, start, end)
+    v = await load_validators(db)
+    headers = cache_headers(make_etag(v.generation, *cache_key), v.changed_at)
+    if is_not_modified(request, headers["ETag"], v.changed_at):
+        return not_modified(headers)
+
+    body = country_cache.get(cache_key)
+    if body is None:
+        generation = country_cache.generation
+        history = await run_sync(db, _history, key, start, end)
+        if history is None:
+            raise HTTPException(status_code=404, detail={"error": "Country not found"})
+        body = dumps(history)
+        country_cache.set(cache_key, body, generation)
+    return _json(body, headers)
+
+@router.delete("/{name}", status_code=204)
+async def delete_country(name: str, db: DbSession = Depends(get_db)):
+    key = normalize_key(name)
+    deleted = await run_sync(db, _delete_by_key, key)
+    if not deleted:
+        raise HTTPException(status_code=404, detail={"error": "Country not found"})
+    row_id, generation = deleted
+    data_changed()
+    await run_sync(db, publish_snapshot)
+    if search_index.generation is not None:
+        search_index.remove([row_id], generation)
     return
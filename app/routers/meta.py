@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select, func
+
+from app.clients.external import upstream_status
+from app.core.config import settings
+from app.core.metrics import render_metrics
+from app.core.startup import startup_report
+from app.db import DbSession, get_db, run_sync
+from app.models.country import Country
+from app.schemas.status import StatusOut
+from app.services.http_cache import cache_headers, is_not_modified, load_validators, make_etag, not_modified
+from app.services.shared_snapshot import current_snapshot
+
+router = APIRouter(tags=["meta"])
+
+@router.get("/")
+async def root():
+    return {"service": "stage2-api", "version": "1.0"}
+
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@router.get("/startup")
+async def startup():
+    return startup_report.as_dict()
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail={"error": "Metrics disabled"})
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@router.get("/status", response_model=StatusOut)
+async def status(request: Request, response: Response, db: DbSession = Depends(get_db)):
+    v = await load_validators(db)
+    # last_refreshed_at moves on every refresh, even one that changed no rows
+    last_modified = max(filter(None, (v.changed_at, v.last_refreshed_at)), default=None)
+    upstreams = upstream_status()
+    # Breaker/fallback state changes without a data generation bump, so it feeds the ETag too
+    upstream_token = sorted((k, u["state"], u["serving_stale"], u["last_failure_at"]) for k, u in upstreams.items())
+    headers = cache_headers(make_etag(v.generation, v.last_refreshed_at, upstream_token, "status"), last_modified)
+    if is_not_modified(request, headers["ETag"], last_modified):
+        return not_modified(headers)
+    response.headers.update(headers)
+
+    snapshot = current_snapshot(v.generation)
+    if snapshot is not None:
+        total = snapshot.rows
+    else:
+        total = await run_sync(db, lambda s: s.scalar(select(func.count()).select_from(Country))) or 0
+    return StatusOut(total_countries=total, last_refreshed_at=v.last_refreshed_at, upstreams=upstreams)
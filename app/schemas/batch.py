@@ -0,0 +1,33 @@
+from typing import Annotated
+from pydantic import BaseModel, Field, StringConstraints, model_validator
+
+MAX_BATCH_NAMES = 1000
+
+CountryName = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=191)]
+
+class CountryBatchLookupIn(BaseModel):
+    names: list[CountryName] = Field(min_length=1, max_length=MAX_BATCH_NAMES)
+
+class CountryPatchIn(BaseModel):
+    """Only the fields present in the request are written."""
+    name: CountryName
+    capital: str | None = None
+    region: str | None = None
+    population: int = Field(default=0, ge=0)
+    currency_code: str | None = Field(default=None, max_length=16)
+    exchange_rate: float | None = Field(default=None, gt=0, allow_inf_nan=False)
+    estimated_gdp: float | None = Field(default=None, ge=0, allow_inf_nan=False)
+    flag_url: str | None = None
+
+class CountryBatchMutateIn(BaseModel):
+    delete: list[CountryName] = Field(default_factory=list)
+    update: list[CountryPatchIn] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def _bounded(self):
+        total = len(self.delete) + len(self.update)
+        if total == 0:
+            raise ValueError("delete and update cannot both be empty")
+        if total > MAX_BATCH_NAMES:
+            raise ValueError(f"at most {MAX_BATCH_NAMES} operations per batch")
+        return self
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+MAX_BATCH_SIZE = 1000
+
+class ConvertItemIn(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    from_: str = Field(alias="from", min_length=1, max_length=16)
+    to: str = Field(min_length=1, max_length=16)
+    amount: float = Field(allow_inf_nan=False)
+
+class ConvertBatchIn(BaseModel):
+    items: list[ConvertItemIn] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, ConfigDict
+
+class TopCountryOut(BaseModel):
+    name: str
+    estimated_gdp: float
+
+class CountryStatsOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    group: str | None
+    count: int
+    total_population: int
+    gdp_sum: float
+    gdp_avg: float | None
+    gdp_max: float | None
+    top: list[TopCountryOut]
@@ -1,16 +1,35 @@
 from datetime import datetime, timezone
-from pydantic import BaseModel, field_serializer
+from typing import Dict
+from pydantic import BaseModel, Field, field_serializer
+
+def _utc_z(v: datetime | None):
+    if v is None:
+        return None
+    if v.tzinfo is None:
+        v = v.replace(tzinfo=timezone.utc)
+    else:
+        v = v.astimezone(timezone.utc)
+    return v.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class UpstreamStatusOut(BaseModel):
+    state: str
+    consecutive_failures: int
+    last_success_at: datetime | None
+    last_failure_at: datetime | None
+    last_error: str | None
+    serving_stale: bool
+    fallback_available: bool
+    fallback_fetched_at: datetime | None
+
+    @field_serializer("last_success_at", "last_failure_at", "fallback_fetched_at", when_used="json")
+    def _ser_z(self, v: datetime | None):
+        return _utc_z(v)
 
 class StatusOut(BaseModel):
     total_countries: int
     last_refreshed_at: datetime | None
+    upstreams: Dict[str, UpstreamStatusOut] = Field(default_factory=dict)
 
     @field_serializer("last_refreshed_at", when_used="json")
     def _ser_z(self, v: datetime | None):
-        if v is None:
-            return None
-        if v.tzinfo is None:
-            v = v.replace(tzinfo=timezone.utc)
-        else:
-            v = v.astimezone(timezone.utc)
-        return v.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return _utc_z(v)
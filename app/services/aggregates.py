@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.aggregate import CountryAggregate
+from app.models.country import Country
+
+# Longest top-N list stored per group; GET /countries/stats may ask for fewer
+AGGREGATE_TOP_SIZE = 10
+
+# group_by -> (normalized key column, display column)
+_GROUPS = {
+    "region": (Country.region_key, Country.region),
+    "currency": (Country.currency_key, Country.currency_code),
+}
+ALL = "all"
+
+def _compute(db: Session, group_by: str, keys: Optional[Iterable[Optional[str]]]) -> List[dict]:
+    stmt_stats = select(
+        func.count(),
+        func.coalesce(func.sum(Country.population), 0),
+        func.count(Country.estimated_gdp),
+        func.coalesce(func.sum(Country.estimated_gdp), 0.0),
+        func.avg(Country.estimated_gdp),
+        func.max(Country.estimated_gdp),
+    )
+    stmt_top = select(Country.name, Country.estimated_gdp).where(Country.estimated_gdp.isnot(None))
+
+    if group_by == ALL:
+        stats = [("", None, *db.execute(stmt_stats).one())]
+        top_rows = db.execute(stmt_top.order_by(Country.estimated_gdp.desc()).limit(AGGREGATE_TOP_SIZE)).all()
+        tops = {"": [(n, g) for n, g in top_rows]}
+    else:
+        key_col, label_col = _GROUPS[group_by]
+        stmt_stats = stmt_stats.add_columns(key_col, func.min(label_col)).group_by(key_col)
+        stmt_top = stmt_top.add_columns(key_col).order_by(key_col, Country.estimated_gdp.desc())
+        if keys is not None:
+            keys = list(keys)
+            cond = key_col.in_([k for k in keys if k]) if any(keys) else None
+            if None in keys or "" in keys:
+                cond = key_col.is_(None) if cond is None else (cond | key_col.is_(None))
+            stmt_stats = stmt_stats.where(cond)
+            stmt_top = stmt_top.where(cond)
+        stats = [(key or "", label, *rest) for (*rest, key, label) in db.execute(stmt_stats).all()]
+        tops = {
+            (key or ""): [(n, g) for n, g, _ in list(rows)[:AGGREGATE_TOP_SIZE]]
+            for key, rows in groupby(db.execute(stmt_top).all(), key=lambda r: r[2])
+        }
+
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "group_by": group_by,
+            "group_key": key,
+            "label": label,
+            "count": count,
+            "total_population": int(pop or 0),
+            "gdp_count": gdp_count,
+            "gdp_sum": float(gdp_sum or 0.0),
+            "gdp_avg": float(gdp_avg) if gdp_avg is not None else None,
+            "gdp_max": float(gdp_max) if gdp_max is not None else None,
+            "top": [[n, float(g)] for n, g in tops.get(key, [])],
+            "updated_at": now,
+        }
+        for key, label, count, pop, gdp_count, gdp_sum, gdp_avg, gdp_max in stats
+    ]
+
+def rebuild_aggregates(db: Session, scope: Optional[Dict[str, Iterable[Optional[str]]]] = None) -> None:
+    """
+    Recompute rollups inside the caller's transaction. `scope` limits the
+    work to some group keys per group_by (e.g. the groups of a deleted
+    country); the global "all" row is always recomputed.
+    """
+    table = CountryAggregate.__table__
+    for group_by in (ALL, *_GROUPS):
+        keys = None if scope is None or group_by == ALL else scope.get(group_by)
+        if scope is not None and group_by != ALL and not keys:
+            continue
+        stmt = delete(table).where(table.c.group_by == group_by)
+        if keys is not None:
+            keys = list(keys)
+            stmt = stmt.where(table.c.group_key.in_([k or "" for k in keys]))
+        db.execute(stmt)
+        rows = _compute(db, group_by, keys)
+        if rows:
+            db.execute(insert(table), rows)
+
+def load_aggregates(db: Session, group_by: str) -> List[CountryAggregate]:
+    return list(db.scalars(
+        select(CountryAggregate)
+        .where(CountryAggregate.group_by == group_by)
+        .order_by(CountryAggregate.group_key)
+    ))
+
+def summary_from_aggregates(db: Session) -> Optional[Tuple[int, List[Tuple[str, float]]]]:
+    """(total, top5) from the global rollup, or None if it hasn't been built yet."""
+    row = db.scalar(select(CountryAggregate).where(CountryAggregate.group_by == ALL))
+    if row is None:
+        return None
+    return row.count, [(n, float(g)) for n, g in row.top[:5]]
@@ -0,0 +1,111 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.country import Country
+from app.services.aggregates import rebuild_aggregates
+from app.services.listing import COUNTRY_COLUMNS
+from app.services.meta import bump_generation
+from app.services.snapshots import record_deletions, record_snapshots
+from app.utils.text import normalize_key
+
+# Fields a batch patch may set; keys derived from them are kept in step
+PATCHABLE_FIELDS = ("capital", "region", "population", "currency_code", "exchange_rate", "estimated_gdp", "flag_url")
+LOOKUP_CHUNK = 500
+
+class MissingCountries(LookupError):
+    def __init__(self, names: Sequence[str]):
+        super().__init__(f"Country not found: {', '.join(names)}")
+        self.names = list(names)
+
+@dataclass
+class BatchResult:
+    deleted_ids: List[int] = field(default_factory=list)
+    updated_ids: List[int] = field(default_factory=list)
+    generation: Optional[int] = None
+
+def lookup_many(db: Session, keys: Sequence[str]) -> Dict[str, tuple]:
+    """COUNTRY_COLUMNS rows by name_key, one IN query per LOOKUP_CHUNK keys."""
+    found: Dict[str, tuple] = {}
+    for i in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys[i:i + LOOKUP_CHUNK]
+        stmt = select(Country.name_key, *COUNTRY_COLUMNS).where(Country.name_key.in_(chunk))
+        for row in db.execute(stmt).all():
+            found[row[0]] = tuple(row[1:])
+    return found
+
+def apply_batch(db: Session, deletes: Sequence[str], updates: Sequence[Dict[str, Any]]) -> BatchResult:
+    """
+    Delete and patch countries by name in one transaction. Every name must
+    exist, otherwise nothing is written and MissingCountries lists the
+    unknown ones. Patched rows get content_hash cleared so the next refresh
+    rewrites them from upstream rather than treating them as unchanged, and
+    (like deletes) are snapshotted for history and as_of.
+    """
+    delete_keys = {normalize_key(n): n for n in deletes}
+    update_keys = {normalize_key(u["name"]): u for u in updates}
+    wanted = list(dict.fromkeys([*delete_keys, *update_keys]))
+
+    result = BatchResult()
+    table = Country.__table__
+    rows = {}
+    for i in range(0, len(wanted), LOOKUP_CHUNK):
+        stmt = select(Country.id, Country.name_key, Country.region_key, Country.currency_key).where(
+            Country.name_key.in_(wanted[i:i + LOOKUP_CHUNK])
+        )
+        rows.update({r.name_key: r for r in db.execute(stmt).all()})
+    missing = [delete_keys[k] if k in delete_keys else update_keys[k]["name"] for k in wanted if k not in rows]
+    if missing:
+        db.rollback()
+        raise MissingCountries(missing)
+
+    scope: Dict[str, Set[Optional[str]]] = {"region": set(), "currency": set()}
+    for key in delete_keys:
+        row = rows[key]
+        result.deleted_ids.append(row.id)
+        scope["region"].add(row.region_key)
+        scope["currency"].add(row.currency_key)
+
+    params: Dict[tuple, List[Dict[str, Any]]] = {}
+    for key, patch in update_keys.items():
+        if key in delete_keys:
+            continue  # deleting wins over patching the same row
+        row = rows[key]
+        values = {f: patch[f] for f in PATCHABLE_FIELDS if f in patch}
+        scope["region"].add(row.region_key)
+        scope["currency"].add(row.currency_key)
+        if "region" in values:
+            values["region_key"] = normalize_key(values["region"])
+            scope["region"].add(values["region_key"])
+        if "currency_code" in values:
+            values["currency_key"] = normalize_key(values["currency_code"])
+            scope["currency"].add(values["currency_key"])
+        values["content_hash"] = None
+        # executemany needs the same parameter keys per statement
+        params.setdefault(tuple(sorted(values)), []).append({**values, "row_id": row.id})
+        result.updated_ids.append(row.id)
+
+    now = datetime.now(timezone.utc)
+    try:
+        if result.deleted_ids and settings.SNAPSHOTS_ENABLED:
+            record_deletions(db, result.deleted_ids, now)
+        for i in range(0, len(result.deleted_ids), LOOKUP_CHUNK):
+            db.execute(delete(table).where(table.c.id.in_(result.deleted_ids[i:i + LOOKUP_CHUNK])))
+        update_stmt = update(table).where(table.c.id == bindparam("row_id"))
+        for batch in params.values():
+            db.execute(update_stmt, batch)
+        if result.updated_ids and settings.SNAPSHOTS_ENABLED:
+            # Patched values are history too, so as_of=now matches the live table
+            record_snapshots(db, result.updated_ids, now)
+        if result.deleted_ids or result.updated_ids:
+            rebuild_aggregates(db, scope)
+            result.generation = bump_generation(db).generation
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result
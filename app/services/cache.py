@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from app.core.config import settings
+from app.services.http_cache import invalidate_validators, on_generation_change
+
+class ResponseCache:
+    """
+    Process-local LRU/TTL store of pre-encoded response bodies.
+
+    Every entry is tagged with the data generation it was built from; bumping
+    the generation (after a refresh or delete) invalidates everything at once.
+    Writers pass the generation they observed *before* reading the DB so a
+    body computed across a concurrent bump is never stored as current.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            generation, expires_at, body = entry
+            if generation != self._generation or expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: Hashable, body: Any, generation: int) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (generation, time.monotonic() + self._ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self) -> int:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            return self._generation
+
+country_cache = ResponseCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CACHE_TTL_SECONDS,
+)
+
+# gzip/br encodings of cached bodies, keyed by (encoding, cache key); no TTL
+# since entries only go stale when the generation moves
+variant_cache = ResponseCache(
+    max_entries=settings.COMPRESSION_CACHE_MAX_ENTRIES,
+    ttl_seconds=float("inf"),
+)
+
+def data_changed() -> None:
+    """Drop every process-local derivative of the countries data."""
+    country_cache.bump()
+    variant_cache.bump()
+    invalidate_validators()
+
+def _generation_moved(generation: int) -> None:
+    # Another worker (or a direct DB write) changed the data: drop bodies built from the old rows
+    country_cache.bump()
+    variant_cache.bump()
+
+on_generation_change(_generation_moved)
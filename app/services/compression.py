@@ -0,0 +1,159 @@
+import asyncio
+import gzip
+import logging
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+from sqlalchemy import distinct, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import run_sync, session_scope
+from app.models.country import Country
+from app.services.cache import country_cache, variant_cache
+from app.services.image import get_summary_png, wait_for_render
+from app.services.listing import COUNTRY_KEYS, list_cache_key, select_countries
+from app.utils.encoding import dumps, rows_to_dicts
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Most preferred first when a client weights them equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Bodies above this are compressed off the event loop
+_INLINE_LIMIT = 64 * 1024
+
+def negotiate(accept_encoding: Optional[str], supported: Sequence[str] = ENCODINGS) -> Optional[str]:
+    """Best of `supported` by the Accept-Encoding q-values, or None for identity."""
+    if not settings.COMPRESSION_ENABLED or not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token.strip().lower()] = q
+    star = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for enc in supported:
+        q = weights.get(enc, star)
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """Distinct strong validator per representation: '"abc"' -> '"abc-gzip"'."""
+    return etag if encoding is None else etag[:-1] + f'-{encoding}"'
+
+def expected_encoding(key: Hashable, encoding: Optional[str]) -> Optional[str]:
+    """`encoding`, unless this body is already known not to be worth compressing (drives the ETag before the body is built)."""
+    if encoding is not None and variant_cache.get((encoding, key)) == b"":
+        return None
+    return encoding
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compressed body, or b"" when it is too small or saves too little to be worth sending."""
+    if len(body) < settings.COMPRESSION_MIN_BYTES:
+        return b""
+    if encoding == "br":
+        data = brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    else:
+        data = gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+    if len(data) > len(body) * (1 - settings.COMPRESSION_MIN_SAVINGS):
+        return b""
+    return data
+
+async def encoded_variant(key: Hashable, body: bytes, encoding: Optional[str], generation: int) -> Tuple[bytes, Optional[str]]:
+    """
+    (body, Content-Encoding) for `encoding`, compressing at most once per key
+    and generation. Variants that are not worth it are remembered as b"" so
+    the identity body is served without retrying.
+    """
+    if encoding is None:
+        return body, None
+    cache_key = (encoding, key)
+    data = variant_cache.get(cache_key)
+    if data is None:
+        if len(body) > _INLINE_LIMIT:
+            data = await asyncio.to_thread(compress, body, encoding)
+        else:
+            data = compress(body, encoding)
+        variant_cache.set(cache_key, data, generation)
+    return (data, encoding) if data else (body, None)
+
+def precompress(key: Hashable, body: bytes, generation: int) -> None:
+    """Fill every supported variant of `body` (runs off the event loop)."""
+    for encoding in ENCODINGS:
+        variant_cache.set((encoding, key), compress(body, encoding), generation)
+
+def _list_scopes(db: Session) -> list:
+    """(region_key, currency_key) of the full listing and of every per-region and per-currency one."""
+    regions = db.scalars(select(distinct(Country.region_key)).where(Country.region_key.is_not(None))).all()
+    currencies = db.scalars(select(distinct(Country.currency_key)).where(Country.currency_key.is_not(None))).all()
+    return [(None, None), *((r, None) for r in sorted(regions)), *((None, c) for c in sorted(currencies))]
+
+async def precompute_lists() -> int:
+    """
+    Encode the default (unsorted, unpaginated, all fields) GET /countries
+    bodies once and store their identity and compressed variants, so the
+    first reader after a refresh is served from memory. Stops early when
+    the data moves on underneath it; returns the number of lists prepared.
+    """
+    generation = country_cache.generation
+    vgeneration = variant_cache.generation
+    done = 0
+    async with session_scope() as db:
+        scopes = await run_sync(db, _list_scopes)
+        for region_key, currency_key in scopes[:settings.COMPRESSION_CACHE_MAX_ENTRIES // len(ENCODINGS)]:
+            if variant_cache.generation != vgeneration:
+                break
+            key = list_cache_key(region_key, currency_key)
+            cached = country_cache.get(key)
+            if cached is None:
+                rows, _ = await run_sync(db, select_countries, region_key, currency_key)
+                cached = (dumps(rows_to_dicts(COUNTRY_KEYS, rows)), None)
+                country_cache.set(key, cached, generation)
+            if any(variant_cache.get((enc, key)) is None for enc in ENCODINGS):
+                await asyncio.to_thread(precompress, key, cached[0], vgeneration)
+            done += 1
+    return done
+
+_precompute_task: Optional[asyncio.Task] = None
+
+async def precompute_image() -> None:
+    """Encode the summary PNG once its render (queued by the same refresh) lands."""
+    vgeneration = variant_cache.generation
+    await wait_for_render()
+    png = await get_summary_png()
+    if png is not None:
+        await asyncio.to_thread(precompress, ("image", png.etag), png.data, vgeneration)
+
+async def _run_precompute() -> None:
+    try:
+        await precompute_lists()
+        await precompute_image()
+    except Exception:
+        logger.exception("Precomputing compressed list responses failed")
+
+def schedule_precompute() -> None:
+    """Start (or restart) the post-refresh precompute in the background."""
+    global _precompute_task
+    if not (settings.COMPRESSION_ENABLED and settings.COMPRESSION_PRECOMPUTE):
+        return
+    if _precompute_task is not None and not _precompute_task.done():
+        _precompute_task.cancel()
+    _precompute_task = asyncio.create_task(_run_precompute())
+
+async def wait_for_precompute() -> None:
+    """Await the in-flight precompute, if any (benchmarks and tests)."""
+    if _precompute_task is not None:
+        await asyncio.gather(_precompute_task, return_exceptions=True)
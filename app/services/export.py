@@ -0,0 +1,46 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Optional, Sequence
+
+from app.db import stream_partitions
+from app.services.listing import ordered_statements
+from app.utils.encoding import dumps, rows_to_dicts
+
+EXPORT_BATCH_SIZE = 500
+
+async def _encoded(fmt: str, statements, keys: Sequence[str]) -> AsyncIterator[bytes]:
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(keys)
+        yield buf.getvalue().encode()
+        async for part in stream_partitions(statements, EXPORT_BATCH_SIZE):
+            buf.seek(0)
+            buf.truncate()
+            for item in rows_to_dicts(keys, part):
+                writer.writerow(["" if v is None else v for v in item.values()])
+            yield buf.getvalue().encode()
+    else:
+        async for part in stream_partitions(statements, EXPORT_BATCH_SIZE):
+            yield b"".join(dumps(item) + b"\n" for item in rows_to_dicts(keys, part))
+
+async def _gzipped(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+def export_stream(
+    fmt: str,
+    region_key: Optional[str],
+    currency_key: Optional[str],
+    sort: Optional[str],
+    keys: Sequence[str],
+    gzip: bool = False,
+) -> AsyncIterator[bytes]:
+    """NDJSON or CSV body for GET /countries/export, produced batch by batch."""
+    chunks = _encoded(fmt, ordered_statements(region_key, currency_key, sort, keys), keys)
+    return _gzipped(chunks) if gzip else chunks
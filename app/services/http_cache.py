@@ -0,0 +1,102 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.db import DbSession, run_sync
+from app.services.meta import get_meta
+
+@dataclass(frozen=True)
+class Validators:
+    generation: int
+    last_refreshed_at: Optional[datetime]
+    changed_at: Optional[datetime]
+
+_memo: Optional[Validators] = None
+_memo_expires = 0.0
+_memo_lock = threading.Lock()
+# Last generation read from meta_cache and who to tell when it moves
+_seen_generation: Optional[int] = None
+_generation_listeners: List[Callable[[int], None]] = []
+
+def on_generation_change(fn: Callable[[int], None]) -> None:
+    """Call `fn(generation)` whenever load_validators reads a generation other than the last one."""
+    _generation_listeners.append(fn)
+
+def _utc(v: Optional[datetime]) -> Optional[datetime]:
+    if v is None:
+        return None
+    return v.replace(tzinfo=timezone.utc) if v.tzinfo is None else v.astimezone(timezone.utc)
+
+async def load_validators(db: DbSession) -> Validators:
+    """
+    Current data generation from meta_cache. Memoized for
+    HTTP_VALIDATORS_TTL_SECONDS so hot paths skip the lookup; local data
+    changes clear the memo immediately. A generation moved by another
+    worker is reported to on_generation_change listeners before it is
+    returned, so process-local caches never outlive the ETags built from it.
+    """
+    global _memo, _memo_expires, _seen_generation
+    now = time.monotonic()
+    with _memo_lock:
+        if _memo is not None and now < _memo_expires:
+            return _memo
+    meta = await run_sync(db, get_meta)
+    v = Validators(
+        generation=(meta.generation or 0) if meta else 0,
+        last_refreshed_at=_utc(meta.last_refreshed_at) if meta else None,
+        changed_at=_utc(meta.changed_at or meta.last_refreshed_at) if meta else None,
+    )
+    with _memo_lock:
+        moved = _seen_generation is not None and v.generation != _seen_generation
+        _seen_generation = v.generation
+        _memo, _memo_expires = v, now + settings.HTTP_VALIDATORS_TTL_SECONDS
+    if moved:
+        for fn in _generation_listeners:
+            fn(v.generation)
+    return v
+
+def invalidate_validators() -> None:
+    global _memo
+    with _memo_lock:
+        _memo = None
+
+def make_etag(generation: Any, *parts: Any) -> str:
+    raw = "|".join(str(p) for p in (generation, *parts))
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:24] + '"'
+
+def cache_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """RFC 9110 precedence: If-None-Match wins; If-Modified-Since only when it's absent."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = [t.strip() for t in inm.split(",")]
+        return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+    ims = request.headers.get("if-modified-since")
+    if ims is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(ims)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
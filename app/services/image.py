@@ -1,23 +1,62 @@
-from typing import List, Tuple
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime, timezone
 
-from PIL import Image, ImageDraw, ImageFont
+from app.core.metrics import refresh_phase_duration
 
 CACHE_PATH = Path("cache")
 SUMMARY_PATH = CACHE_PATH / "summary.png"
 
+@dataclass(frozen=True)
+class SummaryPng:
+    data: bytes
+    etag: str
+    rendered_for: Optional[datetime]
+    # (inode, size, mtime_ns) of SUMMARY_PATH this image was written to / read from
+    stat_key: Optional[Tuple[int, int, int]] = None
+
+# Last rendered image, its input digest and any render in flight
+_current: Optional[SummaryPng] = None
+_current_digest: Optional[str] = None
+_pending: Optional[Future] = None
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary-image")
+
 def ensure_cache_dir():
     CACHE_PATH.mkdir(parents=True, exist_ok=True)
 
-def generate_summary_image(total: int, top5: List[Tuple[str, float]], ts: datetime):
-    ensure_cache_dir()
+@lru_cache(maxsize=1)
+def _font():
+    from PIL import ImageFont
+
+    return ImageFont.load_default()
+
+def _stamp(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _digest(total: int, top5: List[Tuple[str, float]], ts: datetime) -> str:
+    # Everything drawn; `ts` is the last data change, so unchanged refreshes keep the image (and ETag)
+    raw = repr((total, [(n, round(g, 2)) for n, g in top5], _stamp(ts)))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def render_summary_png(total: int, top5: List[Tuple[str, float]], ts: datetime) -> bytes:
+    # Pillow is only needed here; importing it lazily keeps it off the startup path
+    from PIL import Image, ImageDraw
 
     width, height = 900, 520
     img = Image.new("RGB", (width, height), color=(245, 247, 250))
     draw = ImageDraw.Draw(img)
-    header_font = ImageFont.load_default()
-    body_font = ImageFont.load_default()
+    header_font = _font()
+    body_font = _font()
 
     # Header
     draw.text((30, 30), "Country Cache Summary", fill=(20, 20, 20), font=header_font)
@@ -35,8 +74,111 @@ def generate_summary_image(total: int, top5: List[Tuple[str, float]], ts: dateti
             draw.text((50, y), f"{i}. {name} — {gdp:,.2f}", fill=(40, 40, 40), font=body_font)
             y += 24
 
-    # Timestamp (UTC)
-    ts_iso = ts.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    draw.text((30, height - 50), f"Last refresh: {ts_iso}", fill=(100, 100, 100), font=body_font)
+    # Time of the data shown (UTC): its last change, not the last refresh
+    draw.text((30, height - 50), f"Data as of: {_stamp(ts)}", fill=(100, 100, 100), font=body_font)
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+def _write_atomic(path: Path, data: bytes) -> Tuple[int, int, int]:
+    """Write via rename; returns the stat key the file has once in place."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            key = _stat_key(os.fstat(f.fileno()))
+        os.replace(tmp, path)
+        return key
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def generate_summary_image(total: int, top5: List[Tuple[str, float]], ts: datetime) -> bool:
+    """Render, publish in memory and persist; returns False when inputs are unchanged."""
+    global _current, _current_digest
+    digest = _digest(total, top5, ts)
+    with _lock:
+        if digest == _current_digest:
+            return False
+
+    with refresh_phase_duration.time("image"):
+        data = render_summary_png(total, top5, ts)
+        ensure_cache_dir()
+        key = _write_atomic(SUMMARY_PATH, data)
+        png = SummaryPng(data=data, etag=_etag(data), rendered_for=ts, stat_key=key)
+    with _lock:
+        _current, _current_digest = png, digest
+    return True
+
+def schedule_summary_image(total: int, top5: List[Tuple[str, float]], ts: datetime) -> Future:
+    """Queue a render on the image worker thread; callers need not wait."""
+    global _pending
+    fut = _executor.submit(generate_summary_image, total, top5, ts)
+    with _lock:
+        _pending = fut
+    return fut
+
+def _etag(data: bytes) -> str:
+    return '"' + hashlib.sha256(data).hexdigest()[:24] + '"'
+
+def _load_from_disk() -> Optional[SummaryPng]:
+    global _current
+    try:
+        with open(SUMMARY_PATH, "rb") as f:
+            # fstat the opened file: it may be swapped again while we read
+            st = os.fstat(f.fileno())
+            data = f.read()
+    except OSError:
+        return None
+    mtime = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+    png = SummaryPng(data=data, etag=_etag(data), rendered_for=mtime, stat_key=_stat_key(st))
+    with _lock:
+        _current = png
+    return png
+
+def _on_disk_changed(current: SummaryPng) -> bool:
+    """True when another worker has published a newer render since `current`."""
+    try:
+        return _stat_key(SUMMARY_PATH.stat()) != current.stat_key
+    except OSError:
+        return False
+
+async def wait_for_render() -> None:
+    """Wait for the most recently queued render, if any, to finish."""
+    with _lock:
+        pending = _pending
+    if pending is not None:
+        try:
+            await asyncio.wrap_future(pending)
+        except Exception:
+            pass
 
-    img.save(SUMMARY_PATH)
+async def get_summary_png() -> Optional[SummaryPng]:
+    """
+    Current image from memory; waits for a first render in flight, else
+    falls back to disk. A file replaced by another worker's refresh is
+    picked up by comparing its stat with the one the image was loaded from.
+    """
+    with _lock:
+        current, pending = _current, _pending
+    if current is not None:
+        if _on_disk_changed(current):
+            return await asyncio.to_thread(_load_from_disk) or current
+        return current
+    if pending is not None:
+        try:
+            await asyncio.wrap_future(pending)
+        except Exception:
+            pass
+        with _lock:
+            if _current is not None:
+                return _current
+    return await asyncio.to_thread(_load_from_disk)
@@ -0,0 +1,232 @@
+import base64
+import json
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.country import Country
+from app.services.snapshots import select_as_of
+from app.utils.text import normalize_key
+
+# Columns of CountryOut, in output order; rows are encoded without building models
+COUNTRY_COLUMNS = (
+    Country.id,
+    Country.name,
+    Country.capital,
+    Country.region,
+    Country.population,
+    Country.currency_code,
+    Country.exchange_rate,
+    Country.estimated_gdp,
+    Country.flag_url,
+    Country.last_refreshed_at,
+)
+COUNTRY_KEYS = tuple(col.key for col in COUNTRY_COLUMNS)
+_COLUMNS_BY_KEY = {col.key: col for col in COUNTRY_COLUMNS}
+
+MAX_PAGE_SIZE = 1000
+
+class InvalidQuery(ValueError):
+    """Bad `fields` or `cursor` value; `field` names the offending parameter."""
+
+    def __init__(self, field: str, message: str):
+        super().__init__(message)
+        self.field = field
+
+@dataclass(frozen=True)
+class _Segment:
+    """One ordered slice of the result; GDP sorts are ranked rows then NULL rows."""
+    where: Any
+    order: Tuple[Any, ...]
+    descending: bool
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    if not fields:
+        return COUNTRY_KEYS
+    keys: List[str] = []
+    for part in fields.split(","):
+        key = part.strip()
+        if key and key not in keys:
+            keys.append(key)
+    unknown = [k for k in keys if k not in _COLUMNS_BY_KEY]
+    if unknown:
+        raise InvalidQuery("fields", f"Unknown field(s): {', '.join(unknown)}")
+    return tuple(keys) or COUNTRY_KEYS
+
+def list_cache_key(
+    region_key: Optional[str] = None,
+    currency_key: Optional[str] = None,
+    sort: Optional[str] = None,
+    keys: Sequence[str] = COUNTRY_KEYS,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    as_of: Optional[datetime] = None,
+) -> tuple:
+    """Response cache / ETag key of one GET /countries result, shared with the refresh precompute."""
+    return ("list", region_key, currency_key, sort, tuple(keys), limit, cursor, as_of)
+
+def _segments(sort: Optional[str]) -> List[_Segment]:
+    if sort == "gdp_desc":
+        return [
+            _Segment(Country.estimated_gdp.isnot(None), (Country.estimated_gdp, Country.id), True),
+            _Segment(Country.estimated_gdp.is_(None), (Country.id,), False),
+        ]
+    if sort == "gdp_asc":
+        return [
+            _Segment(Country.estimated_gdp.isnot(None), (Country.estimated_gdp, Country.id), False),
+            _Segment(Country.estimated_gdp.is_(None), (Country.id,), False),
+        ]
+    if sort == "name_asc":
+        return [_Segment(None, (Country.name_key, Country.id), False)]
+    if sort == "name_desc":
+        return [_Segment(None, (Country.name_key, Country.id), True)]
+    return [_Segment(None, (Country.id,), False)]
+
+def encode_cursor(sort: Optional[str], phase: int, values: Sequence[Any]) -> str:
+    raw = json.dumps([sort, phase, list(values)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _cursor_value_ok(col: Any, value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if col.key == "name_key":
+        return isinstance(value, str)
+    if col.key == "estimated_gdp":
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, int)  # id
+
+def decode_cursor(cursor: str, sort: Optional[str]) -> Tuple[int, List[Any]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        c_sort, phase, values = json.loads(raw)
+    except Exception:
+        raise InvalidQuery("cursor", "Invalid cursor")
+    segments = _segments(sort)
+    if c_sort != sort:
+        raise InvalidQuery("cursor", "Cursor does not match this query")
+    # Values are bound straight into the keyset predicate: check them against the phase's columns
+    if (
+        isinstance(phase, bool) or not isinstance(phase, int) or not 0 <= phase < len(segments)
+        or not isinstance(values, list) or len(values) != len(segments[phase].order)
+        or not all(_cursor_value_ok(col, v) for col, v in zip(segments[phase].order, values))
+    ):
+        raise InvalidQuery("cursor", "Invalid cursor")
+    return phase, values
+
+def _filtered(columns: Sequence[Any], region_key: Optional[str], currency_key: Optional[str]) -> Select:
+    stmt = select(*columns)
+    if region_key:
+        stmt = stmt.where(Country.region_key == region_key)
+    if currency_key:
+        stmt = stmt.where(Country.currency_key == currency_key)
+    return stmt
+
+def _ordered(stmt: Select, seg: _Segment) -> Select:
+    if seg.where is not None:
+        stmt = stmt.where(seg.where)
+    return stmt.order_by(*(c.desc() if seg.descending else c.asc() for c in seg.order))
+
+def _after(seg: _Segment, values: Sequence[Any]):
+    key = tuple_(*seg.order) if len(seg.order) > 1 else seg.order[0]
+    bound = tuple_(*values) if len(values) > 1 else values[0]
+    return key < bound if seg.descending else key > bound
+
+def _projection(keys: Sequence[str], segments: List[_Segment]) -> Tuple[list, List[str]]:
+    # Sort keys ride along after the projected columns; zip(keys, row) drops them
+    sort_keys = list(dict.fromkeys(col.key for seg in segments for col in seg.order))
+    return [_COLUMNS_BY_KEY[k] for k in keys] + [getattr(Country, k) for k in sort_keys], sort_keys
+
+def ordered_statements(
+    region_key: Optional[str] = None,
+    currency_key: Optional[str] = None,
+    sort: Optional[str] = None,
+    keys: Sequence[str] = COUNTRY_KEYS,
+) -> List[Select]:
+    """Statements whose concatenated results are the full, ordered GET /countries result."""
+    segments = _segments(sort)
+    columns, _ = _projection(keys, segments)
+    base = _filtered(columns, region_key, currency_key)
+    return [_ordered(base, seg) for seg in segments]
+
+def select_countries(
+    db: Session,
+    region_key: Optional[str] = None,
+    currency_key: Optional[str] = None,
+    sort: Optional[str] = None,
+    keys: Sequence[str] = COUNTRY_KEYS,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[list, Optional[str]]:
+    """
+    Rows for GET /countries as tuples whose leading items follow `keys`, plus
+    the cursor for the next page (None when exhausted or unpaginated).
+
+    Filters hit the normalized key columns and every order is index-backed:
+    GDP sorts read non-NULL rows in (estimated_gdp, id) order, then NULL rows
+    by id. Pages are keyset-based, so deep pages cost the same as the first.
+    """
+    segments = _segments(sort)
+    columns, sort_keys = _projection(keys, segments)
+    base = _filtered(columns, region_key, currency_key)
+
+    if limit is None and cursor is None:
+        rows: list = []
+        for stmt in ordered_statements(region_key, currency_key, sort, keys):
+            rows.extend(db.execute(stmt).all())
+        return rows, None
+
+    limit = limit or MAX_PAGE_SIZE
+    phase, after = decode_cursor(cursor, sort) if cursor else (0, None)
+    tagged: List[Tuple[int, Any]] = []
+    for i in range(phase, len(segments)):
+        seg = segments[i]
+        stmt = _ordered(base, seg)
+        if after is not None and i == phase:
+            stmt = stmt.where(_after(seg, after))
+        got = db.execute(stmt.limit(limit + 1 - len(tagged))).all()
+        tagged.extend((i, row) for row in got)
+        if len(tagged) > limit:
+            break
+
+    if len(tagged) <= limit:
+        return [row for _, row in tagged], None
+
+    tagged = tagged[:limit]
+    seg_index, last = tagged[-1]
+    offset = len(keys)
+    values = [last[offset + sort_keys.index(col.key)] for col in segments[seg_index].order]
+    return [row for _, row in tagged], encode_cursor(sort, seg_index, values)
+
+def _sort_in_memory(rows: list, sort: Optional[str]) -> list:
+    """Same orders as select_countries, for result sets built outside SQL."""
+    gdp_i, id_i, name_key_i = COUNTRY_KEYS.index("estimated_gdp"), COUNTRY_KEYS.index("id"), len(COUNTRY_KEYS)
+    if sort in ("gdp_desc", "gdp_asc"):
+        ranked = sorted(
+            (r for r in rows if r[gdp_i] is not None),
+            key=lambda r: (r[gdp_i], r[id_i]),
+            reverse=sort == "gdp_desc",
+        )
+        return ranked + sorted((r for r in rows if r[gdp_i] is None), key=lambda r: r[id_i])
+    if sort in ("name_asc", "name_desc"):
+        return sorted(rows, key=lambda r: (r[name_key_i], r[id_i]), reverse=sort == "name_desc")
+    return sorted(rows, key=lambda r: r[id_i])
+
+def select_countries_as_of(
+    db: Session,
+    as_of: datetime,
+    region_key: Optional[str] = None,
+    currency_key: Optional[str] = None,
+    sort: Optional[str] = None,
+    keys: Sequence[str] = COUNTRY_KEYS,
+) -> list:
+    """Point-in-time variant of select_countries (unpaginated), built from snapshots."""
+    rows = select_as_of(db, as_of, region_key)
+    if currency_key:
+        code_i = COUNTRY_KEYS.index("currency_code")
+        rows = [r for r in rows if normalize_key(r[code_i]) == currency_key]
+    idx = [COUNTRY_KEYS.index(k) for k in keys]
+    return [tuple(r[i] for i in idx) for r in _sort_in_memory(rows, sort)]
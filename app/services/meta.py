@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.meta import MetaCache
+
+def get_meta(db: Session) -> Optional[MetaCache]:
+    return db.scalar(select(MetaCache).where(MetaCache.id == 1))
+
+def bump_generation(db: Session, refreshed_at: Optional[datetime] = None) -> MetaCache:
+    """Record a data change in the single meta row (caller owns the transaction)."""
+    now = refreshed_at or datetime.now(timezone.utc)
+    meta = get_meta(db)
+    if not meta:
+        meta = MetaCache(id=1, generation=0)
+        db.add(meta)
+    meta.generation = (meta.generation or 0) + 1
+    meta.changed_at = now
+    if refreshed_at is not None:
+        meta.last_refreshed_at = refreshed_at
+    return meta
+
+def mark_refreshed(db: Session, refreshed_at: datetime, changed: bool = True) -> MetaCache:
+    """Stamp a completed refresh; the generation only moves when rows were written."""
+    if changed:
+        return bump_generation(db, refreshed_at=refreshed_at)
+    meta = get_meta(db)
+    if not meta:
+        meta = MetaCache(id=1, generation=0)
+        db.add(meta)
+    meta.last_refreshed_at = refreshed_at
+    return meta
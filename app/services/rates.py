@@ -0,0 +1,120 @@
+import math
+import threading
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db import DbSession, run_sync
+from app.models.exchange_rate import ExchangeRate
+from app.services.http_cache import load_validators
+
+# open.er-api is queried for USD (see EXTERNAL_RATES_URL); rates are units per USD
+RATES_BASE = "USD"
+
+def _clean(rates: Dict[str, float]) -> Dict[str, float]:
+    return {code.upper(): rate for code, rate in rates.items() if math.isfinite(rate) and rate > 0}
+
+def write_rates(db: Session, rates: Dict[str, float], now: datetime) -> int:
+    """
+    Sync exchange_rates with a freshly fetched map (caller owns the
+    transaction); returns the number of rows inserted, updated or removed.
+    An empty map leaves the table alone rather than wiping it.
+    """
+    fresh = _clean(rates)
+    if not fresh:
+        return 0
+    existing = dict(db.execute(select(ExchangeRate.code, ExchangeRate.rate)).all())
+    table = ExchangeRate.__table__
+
+    to_insert = [
+        {"code": code, "base": RATES_BASE, "rate": rate, "updated_at": now}
+        for code, rate in fresh.items() if code not in existing
+    ]
+    to_update = [
+        {"row_code": code, "rate": rate, "updated_at": now}
+        for code, rate in fresh.items() if code in existing and existing[code] != rate
+    ]
+    gone = [code for code in existing if code not in fresh]
+
+    if to_insert:
+        db.execute(insert(table), to_insert)
+    if to_update:
+        db.execute(update(table).where(table.c.code == bindparam("row_code")), to_update)
+    if gone:
+        db.execute(delete(table).where(table.c.code.in_(gone)))
+    return len(to_insert) + len(to_update) + len(gone)
+
+def load_rates(db: Session) -> Tuple[List[Tuple[str, float]], Optional[datetime]]:
+    rows = db.execute(select(ExchangeRate.code, ExchangeRate.rate, ExchangeRate.updated_at)).all()
+    updated_at = max((r.updated_at for r in rows), default=None)
+    return [(r.code, r.rate) for r in rows], updated_at
+
+class UnknownCurrency(ValueError):
+    def __init__(self, codes: Sequence[str]):
+        super().__init__(f"Unknown currency code(s): {', '.join(codes)}")
+        self.codes = list(codes)
+
+@dataclass(frozen=True)
+class _RateState:
+    index: Dict[str, int] = field(default_factory=dict)
+    rates: array = field(default_factory=lambda: array("d"))
+    updated_at: Optional[datetime] = None
+    # meta.last_refreshed_at the state was loaded for; every refresh rewrites rates
+    loaded_for: Optional[datetime] = None
+
+class RateTable:
+    """
+    Dense in-memory rates: currency code -> slot, plus a float64 array of
+    rates by slot. Refresh swaps in a whole new state at once, so readers
+    always see one consistent table without locking.
+    """
+
+    def __init__(self):
+        self._state: Optional[_RateState] = None
+        self._lock = threading.Lock()
+
+    @property
+    def updated_at(self) -> Optional[datetime]:
+        return self._state.updated_at if self._state else None
+
+    def swap(self, rates: Sequence[Tuple[str, float]], updated_at: Optional[datetime], loaded_for: Optional[datetime]) -> None:
+        codes = sorted(code for code, _ in rates)
+        by_code = dict(rates)
+        state = _RateState(
+            index={code: i for i, code in enumerate(codes)},
+            rates=array("d", (by_code[code] for code in codes)),
+            updated_at=updated_at,
+            loaded_for=loaded_for,
+        )
+        with self._lock:
+            self._state = state
+
+    async def ensure_current(self, db: DbSession) -> bool:
+        """Reload from the database when a refresh (here or in another worker) moved last_refreshed_at."""
+        v = await load_validators(db)
+        state = self._state
+        if state is None or state.loaded_for != v.last_refreshed_at:
+            rates, updated_at = await run_sync(db, load_rates)
+            self.swap(rates, updated_at, v.last_refreshed_at)
+        return bool(self._state.index)
+
+    def convert_many(self, items: Sequence[Tuple[str, str, float]]) -> List[Tuple[float, float]]:
+        """(rate, result) for each (from, to, amount), in one pass over the dense array."""
+        state = self._state or _RateState()
+        index, rates = state.index, state.rates
+        src = [index.get(f.upper()) for f, _, _ in items]
+        dst = [index.get(t.upper()) for _, t, _ in items]
+        unknown = sorted(
+            {f.upper() for (f, _, _), i in zip(items, src) if i is None}
+            | {t.upper() for (_, t, _), i in zip(items, dst) if i is None}
+        )
+        if unknown:
+            raise UnknownCurrency(unknown)
+        factors = [rates[d] / rates[s] for s, d in zip(src, dst)]
+        return [(factor, amount * factor) for factor, (_, _, amount) in zip(factors, items)]
+
+rate_table = RateTable()
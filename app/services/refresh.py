@@ -1,134 +1,162 @@
-from typing import Dict, Any, Optional
-from random import randint
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Sequence, Tuple
+from random import Random
 from datetime import datetime, timezone
 
-from sqlalchemy import func, select
+from sqlalchemy import bindparam, delete, func, insert, select, update
 from sqlalchemy.orm import Session
 
-from app.clients.external import fetch_countries_and_rates, ExternalClientError
+from app.clients.external import COUNTRIES_SOURCE, RATES_SOURCE, fetch_countries_and_rates, ExternalClientError
+from app.core.config import settings
+from app.core.metrics import refresh_phase_duration
+from app.db import DbSession, run_sync
 from app.models.country import Country
-from app.models.meta import MetaCache
-from app.services.image import generate_summary_image
-from app.utils.text import normalize_key
-
-
-def _extract_currency_code(country: Dict[str, Any]) -> Optional[str]:
-    """Extract the first currency code from the country payload"""
-    currencies = country.get("currencies")
-    if not isinstance(currencies, list) or not currencies:
-        return None
-    first = currencies[0] or {}
-    code = first.get("code")
-    if code and isinstance(code, str) and code.strip():
-        return code.strip().upper()
-    return None
-
-def _safe_float(val) -> Optional[float]:
-    try:
-        if val is None:
-            return None
-        return float(val)
-    except Exception:
-        return None
-
-async def run_refresh(db: Session) -> Dict[str, Any]:
+from app.services.aggregates import rebuild_aggregates, summary_from_aggregates
+from app.services.cache import data_changed
+from app.services.compression import schedule_precompute
+from app.services.http_cache import invalidate_validators
+from app.services.image import schedule_summary_image
+from app.services.meta import bump_generation, get_meta, mark_refreshed
+from app.services.rates import load_rates, rate_table, write_rates
+from app.services.search import load_search_rows, search_index
+from app.services.shared_snapshot import current_snapshot, publish_snapshot
+from app.services.snapshots import compact_snapshots, record_deletions, record_refresh_run, record_snapshots
+from app.services.transform import CountryColumns, estimate_gdp, multiplier_source, transform
+
+UPSERT_BATCH_SIZE = 500
+
+@dataclass
+class RefreshCounts:
+    inserted: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    stale: int = 0
+    pruned: int = 0
+    compacted: int = 0
+    rollup_built: bool = False  # country_aggregates was missing and got built
+    written_ids: List[int] = field(default_factory=list)  # inserted + changed rows
+    pruned_ids: List[int] = field(default_factory=list)
+
+    @property
+    def any_writes(self) -> bool:
+        return bool(self.inserted or self.changed or self.pruned)
+
+    @property
+    def touched(self) -> bool:
+        """Anything a reader could observe, including compacted history."""
+        return self.any_writes or bool(self.compacted) or self.rollup_built
+
+def _apply_delta(db: Session, cols: CountryColumns, now: datetime, prune: bool, rng: Random) -> RefreshCounts:
     """
-    Full refresh:
-      - Fetch countries + rates
-      - Upsert rows (match by name, case-insensitive)
-      - Compute estimated_gdp per rules
-      - Update global last_refreshed_at
-      - Generate summary image
-      - All DB writes happen only if both external fetches succeeded
+    Compare each incoming row's content hash with the stored one and write
+    only inserts and changed rows, as batched executemany statements.
+    Unchanged rows keep their stored values (including estimated_gdp and
+    last_refreshed_at). Rows missing upstream are counted as stale and
+    deleted only when `prune` is set.
     """
-    # External fetches
-    try:
-        countries_payload, rates_map = await fetch_countries_and_rates()
-    except ExternalClientError as e:
-        return {"ok": False, "error": str(e), "source": "external"}
-
-    now = datetime.now(timezone.utc)
-
-    # Transactional upsert
-    inserted = 0
-    updated = 0
+    existing = {
+        name_key: (id_, content_hash)
+        for id_, name_key, content_hash in db.execute(
+            select(Country.id, Country.name_key, Country.content_hash)
+        ).all()
+    }
 
+    counts = RefreshCounts()
+    dirty = [
+        i for i, (name_key, content_hash) in enumerate(zip(cols.name_key, cols.content_hash))
+        if existing.get(name_key, (None, None))[1] != content_hash
+    ]
+    counts.unchanged = len(cols) - len(dirty)
+
+    to_insert: List[Dict[str, Any]] = []
+    to_update: List[Dict[str, Any]] = []
+    for i, gdp in zip(dirty, estimate_gdp(cols, dirty, rng)):
+        row = {**cols.row(i), "estimated_gdp": gdp, "last_refreshed_at": now}
+        current = existing.get(cols.name_key[i])
+        if current is None:
+            to_insert.append(row)
+        else:
+            to_update.append({**row, "row_id": current[0]})
+
+    incoming = set(cols.name_key)
+    stale_ids = [id_ for name_key, (id_, _) in existing.items() if name_key not in incoming]
+    counts.inserted, counts.changed, counts.stale = len(to_insert), len(to_update), len(stale_ids)
+
+    # Core statements against the table so each batch is a single executemany
+    table = Country.__table__
+    insert_stmt = insert(table)
+    update_stmt = update(table).where(table.c.id == bindparam("row_id"))
+    for i in range(0, len(to_insert), UPSERT_BATCH_SIZE):
+        chunk = to_insert[i:i + UPSERT_BATCH_SIZE]
+        db.execute(insert_stmt, chunk)
+        # executemany doesn't hand back generated keys portably; look them up by name_key
+        counts.written_ids += db.execute(
+            select(Country.id).where(Country.name_key.in_([row["name_key"] for row in chunk]))
+        ).scalars().all()
+    for i in range(0, len(to_update), UPSERT_BATCH_SIZE):
+        db.execute(update_stmt, to_update[i:i + UPSERT_BATCH_SIZE])
+    counts.written_ids += [row["row_id"] for row in to_update]
+
+    if prune and stale_ids:
+        if settings.SNAPSHOTS_ENABLED:
+            record_deletions(db, stale_ids, now)
+        for i in range(0, len(stale_ids), UPSERT_BATCH_SIZE):
+            db.execute(delete(table).where(table.c.id.in_(stale_ids[i:i + UPSERT_BATCH_SIZE])))
+        counts.pruned = len(stale_ids)
+        counts.pruned_ids = stale_ids
+
+    return counts
+
+def _as_utc(v: Optional[datetime]) -> Optional[datetime]:
+    return v.replace(tzinfo=timezone.utc) if v is not None and v.tzinfo is None else v
+
+def _write_refresh(
+    db: Session,
+    cols: CountryColumns,
+    rates: Dict[str, float],
+    now: datetime,
+    prune: bool,
+    rng: Random,
+    stale_sources: Sequence[str] = (),
+) -> Tuple[RefreshCounts, int, Optional[datetime], Optional[datetime]]:
+    """
+    Write one refresh; returns (counts, generation, last_refreshed_at, changed_at).
+    Payloads served from last-known-good copies are not news: stale rates
+    are not rewritten, and last_refreshed_at only moves when at least one
+    upstream was actually fetched.
+    """
+    fetched = any(source not in stale_sources for source in (COUNTRIES_SOURCE, RATES_SOURCE))
     with db.begin():
-        existing_by_key = {
-            (nk or ""): id_
-            for (id_, nk) in db.execute(select(Country.id, Country.name_key)).all()
-        }
-
-        for c in countries_payload:
-            name = (c.get("name") or "").strip()
-            if not name:
-                continue
-
-            name_key = normalize_key(name)
-            if not name_key:
-                continue
-
-            capital = (c.get("capital") or None)
-            region = (c.get("region") or None)
-            population = c.get("population")
-            population = int(population or 0)
-            flag_url = c.get("flag") or None
-
-            currency_code = _extract_currency_code(c)
-            exchange_rate = None
-            estimated_gdp = None
-
-            if currency_code is None:
-                exchange_rate = None
-                estimated_gdp = 0.0
-            else:
-                rate = rates_map.get(currency_code)
-                if rate is None or _safe_float(rate) in (None, 0.0):
-                    exchange_rate = None
-                    estimated_gdp = None
-                else:
-                    exchange_rate = float(rate)
-                    multiplier = randint(1000, 2000)
-                    estimated_gdp = (population * multiplier) / exchange_rate if exchange_rate else None
-
-            if name_key in existing_by_key:
-                country_row: Country = db.scalar(
-                    select(Country).where(Country.name_key == name_key)
-                )
-                if country_row:
-                    country_row.name = name
-                    country_row.name_key = name_key
-                    country_row.capital = capital
-                    country_row.region = region
-                    country_row.population = population
-                    country_row.currency_code = currency_code
-                    country_row.exchange_rate = exchange_rate
-                    country_row.estimated_gdp = estimated_gdp
-                    country_row.flag_url = flag_url
-                    country_row.last_refreshed_at = now
-                    updated += 1
-            else:
-                new_row = Country(
-                    name=name,
-                    name_key=name_key,
-                    capital=capital,
-                    region=region,
-                    population=population,
-                    currency_code=currency_code,
-                    exchange_rate=exchange_rate,
-                    estimated_gdp=estimated_gdp,
-                    flag_url=flag_url,
-                    last_refreshed_at=now,
-                )
-                db.add(new_row)
-                inserted += 1
-
-        meta = db.scalar(select(MetaCache).where(MetaCache.id == 1))
-        if not meta:
-            meta = MetaCache(id=1, last_refreshed_at=now)
-            db.add(meta)
+        counts = _apply_delta(db, cols, now, prune, rng)
+        if RATES_SOURCE not in stale_sources:
+            write_rates(db, rates, now)
+        if counts.any_writes:
+            rebuild_aggregates(db)
+        elif summary_from_aggregates(db) is None:
+            # Never built (e.g. a database upgraded with content hashes already in place)
+            rebuild_aggregates(db)
+            counts.rollup_built = True
+        if settings.SNAPSHOTS_ENABLED:
+            if counts.written_ids:
+                run_id = record_refresh_run(db, now, counts.inserted, counts.changed)
+                record_snapshots(db, counts.written_ids, now, run_id)
+            counts.compacted = compact_snapshots(db, now)
+
+        if fetched:
+            meta = mark_refreshed(db, now, changed=counts.touched)
+        elif counts.touched:
+            # Rows rewritten from fallback copies: a data change, not a refresh
+            meta = bump_generation(db)
         else:
-            meta.last_refreshed_at = now
+            meta = get_meta(db)
+    if meta is None:
+        return counts, 0, None, None
+    return counts, meta.generation or 0, _as_utc(meta.last_refreshed_at), _as_utc(meta.changed_at)
+
+def _summary_stats(db: Session) -> Tuple[int, List[Tuple[str, float]]]:
+    precomputed = summary_from_aggregates(db)
+    if precomputed is not None:
+        return precomputed
 
     top5 = db.execute(
         select(Country.name, Country.estimated_gdp)
@@ -139,12 +167,79 @@ async def run_refresh(db: Session) -> Dict[str, Any]:
     top5_list = [(name, float(gdp)) for name, gdp in top5 if gdp is not None]
 
     total = db.scalar(select(func.count()).select_from(Country)) or 0
-    generate_summary_image(total=total, top5=top5_list, ts=now)
+    return total, top5_list
+
+async def run_refresh(db: DbSession, prune: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Delta refresh:
+      - Fetch countries + rates
+      - Transform the payload into columns and hash each record
+      - Insert new rows and rewrite only rows whose hash changed
+        (estimated_gdp is computed for those rows only)
+      - Optionally prune countries that vanished upstream
+      - Rebuild country_aggregates and append history snapshots for
+        written rows in the same transaction, then apply snapshot retention
+      - Persist the rates map to exchange_rates and swap the in-memory rate table
+      - Update global last_refreshed_at (unless every upstream was served stale)
+      - Republish the shared mmap snapshot when rows changed
+      - Queue summary image rendering and the gzip/br encoding of the
+        default list responses (both off the request path)
+      - An upstream that fails after retries (or whose breaker is open) is
+        served from its last-known-good copy and listed in `stale_sources`;
+        DB writes happen only if both sources produced a payload
+    """
+    # External fetches
+    try:
+        with refresh_phase_duration.time("fetch"):
+            countries_payload, rates_map, stale_sources = await fetch_countries_and_rates()
+    except ExternalClientError as e:
+        return {"ok": False, "error": str(e), "source": "external"}
+
+    now = datetime.now(timezone.utc)
+    with refresh_phase_duration.time("transform"):
+        cols = transform(countries_payload, rates_map)
+    if prune is None:
+        prune = settings.REFRESH_PRUNE_STALE
+
+    # Transactional delta write
+    rng = multiplier_source(settings.REFRESH_GDP_SEED)
+    with refresh_phase_duration.time("write"):
+        counts, generation, refreshed_at, changed_at = await run_sync(
+            db, _write_refresh, cols, rates_map, now, prune, rng, stale_sources
+        )
+        rates, rates_updated_at = await run_sync(db, load_rates)
+    rate_table.swap(rates, rates_updated_at, refreshed_at)
+
+    if counts.touched:
+        data_changed()
+        if search_index.generation is not None:
+            # Patch the autocomplete index with just the rows this refresh wrote
+            with refresh_phase_duration.time("index"):
+                written = await run_sync(db, load_search_rows, counts.written_ids) if counts.written_ids else []
+                search_index.upsert(written, generation)
+                search_index.remove(counts.pruned_ids, generation)
+    else:
+        invalidate_validators()
+    if settings.SHARED_SNAPSHOT_ENABLED and (counts.touched or current_snapshot(generation) is None):
+        with refresh_phase_duration.time("snapshot"):
+            await run_sync(db, publish_snapshot)
+
+    with refresh_phase_duration.time("summary"):
+        total, top5_list = await run_sync(db, _summary_stats)
+    # Stamped with the last data change, which (unlike the refresh time) moves only with the data drawn
+    schedule_summary_image(total=total, top5=top5_list, ts=changed_at or refreshed_at or now)
+    schedule_precompute()
 
     return {
         "ok": True,
-        "inserted": inserted,
-        "updated": updated,
+        "inserted": counts.inserted,
+        # Existing rows the refresh matched, as before delta writes; `changed` is the subset rewritten
+        "updated": counts.changed + counts.unchanged,
+        "changed": counts.changed,
+        "unchanged": counts.unchanged,
+        "stale": counts.stale,
+        "pruned": counts.pruned,
         "total": total,
-        "refreshed_at": now,
+        "refreshed_at": refreshed_at,
+        "stale_sources": stale_sources,
     }
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import random
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.db import session_scope
+from app.services.refresh import run_refresh
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RefreshJob:
+    id: str
+    status: str = "pending"  # pending | running | succeeded | failed
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    task: Optional["asyncio.Task"] = field(default=None, repr=False)
+
+def _consume_exception(task: "asyncio.Task") -> None:
+    # Async-mode jobs may never be awaited; log failures instead of leaking them
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("refresh job crashed", exc_info=task.exception())
+
+class RefreshCoordinator:
+    """
+    Owns every refresh run in this process:
+      - single-flight: callers arriving while a run is in flight share it
+      - bounded history of jobs for the async status endpoint
+      - optional periodic loop with jitter
+    """
+
+    def __init__(self, history: int = 50):
+        self._history = history
+        self._jobs: "OrderedDict[str, RefreshJob]" = OrderedDict()
+        self._current: Optional[RefreshJob] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def submit(self) -> RefreshJob:
+        """Start a refresh, or join the one already running."""
+        if self._current is not None and self._current.status in ("pending", "running"):
+            return self._current
+
+        job = RefreshJob(id=uuid.uuid4().hex)
+        job.task = asyncio.create_task(self._execute(job))
+        job.task.add_done_callback(_consume_exception)
+        self._current = job
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._history:
+            self._jobs.popitem(last=False)
+        return job
+
+    async def run(self) -> Dict[str, Any]:
+        """Start or join a refresh and wait for its result."""
+        job = self.submit()
+        return await asyncio.shield(job.task)
+
+    def get_job(self, job_id: str) -> Optional[RefreshJob]:
+        return self._jobs.get(job_id)
+
+    async def _execute(self, job: RefreshJob) -> Dict[str, Any]:
+        job.status = "running"
+        try:
+            async with session_scope() as db:
+                result = await run_refresh(db)
+        except Exception:
+            job.status = "failed"
+            job.result = {"ok": False, "error": "Internal server error"}
+            raise
+        else:
+            job.status = "succeeded" if result.get("ok") else "failed"
+            job.result = result
+            return result
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+
+    def start(self) -> None:
+        if settings.REFRESH_INTERVAL_SECONDS <= 0 or self._loop_task is not None:
+            return
+        self._loop_task = asyncio.create_task(self._periodic())
+
+    async def stop(self) -> None:
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+
+    async def _periodic(self) -> None:
+        while True:
+            delay = settings.REFRESH_INTERVAL_SECONDS + random.uniform(0, settings.REFRESH_JITTER_SECONDS)
+            await asyncio.sleep(delay)
+            try:
+                result = await self.run()
+                if not result.get("ok"):
+                    logger.warning("scheduled refresh failed: %s", result.get("error"))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("scheduled refresh crashed")
+
+refresh_coordinator = RefreshCoordinator(history=settings.REFRESH_JOB_HISTORY)
@@ -0,0 +1,180 @@
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.country import Country
+from app.utils.text import normalize_key
+
+MIN_SIMILARITY = 0.3
+
+@dataclass(frozen=True)
+class _Entry:
+    id: int
+    name: str
+    key: str
+    capital: Optional[str]
+    capital_key: Optional[str]
+    region: Optional[str]
+    trigrams: FrozenSet[str]
+
+def search_key(s: Optional[str]) -> Optional[str]:
+    """normalize_key() with diacritics stripped, so "cote" finds "Côte d'Ivoire"."""
+    key = normalize_key(s)
+    if not key:
+        return None
+    return "".join(ch for ch in unicodedata.normalize("NFKD", key) if not unicodedata.combining(ch))
+
+def trigrams(s: str) -> Set[str]:
+    padded = f"  {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def load_search_rows(db: Session, ids: Optional[Sequence[int]] = None) -> list:
+    """Rows for the index; only those with `ids` (e.g. the rows a write just touched), if given."""
+    stmt = select(Country.id, Country.name, Country.name_key, Country.capital, Country.region)
+    if ids is None:
+        return db.execute(stmt).all()
+    rows = []
+    for i in range(0, len(ids), 500):
+        rows += db.execute(stmt.where(Country.id.in_(ids[i:i + 500]))).all()
+    return rows
+
+class SearchIndex:
+    """
+    In-memory autocomplete index over country names and capitals.
+
+    Prefix lookups bisect sorted (key, id) arrays; fuzzy lookups rank
+    candidates from trigram postings by Jaccard similarity. The index
+    remembers the data generation it reflects so readers can tell when
+    another worker changed the data; local refreshes and deletes patch it
+    in place.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[int, _Entry] = {}
+        self._names: List[Tuple[str, int]] = []
+        self._capitals: List[Tuple[str, int]] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self.generation: Optional[int] = None
+
+    def is_current(self, generation: int) -> bool:
+        return self.generation == generation
+
+    def rebuild(self, rows: Iterable, generation: Optional[int]) -> None:
+        with self._lock:
+            self._entries, self._names, self._capitals, self._postings = {}, [], [], {}
+            for row in rows:
+                self._add(row, sort=False)
+            self._names.sort()
+            self._capitals.sort()
+            self.generation = generation
+
+    def upsert(self, rows: Iterable, generation: Optional[int]) -> None:
+        with self._lock:
+            rows = list(rows)
+            self._remove_ids(r.id for r in rows)
+            for row in rows:
+                self._add(row, sort=True)
+            self.generation = generation
+
+    def remove(self, ids: Iterable[int], generation: Optional[int]) -> None:
+        with self._lock:
+            self._remove_ids(ids)
+            self.generation = generation
+
+    def _add(self, row, sort: bool) -> None:
+        capital_key = search_key(row.capital)
+        entry = _Entry(
+            id=row.id,
+            name=row.name,
+            key=search_key(row.name_key) or row.name_key,
+            capital=row.capital,
+            capital_key=capital_key,
+            region=row.region,
+            trigrams=frozenset(trigrams(search_key(row.name_key) or row.name_key)),
+        )
+        self._entries[entry.id] = entry
+        add = insort if sort else list.append
+        add(self._names, (entry.key, entry.id))
+        if capital_key:
+            add(self._capitals, (capital_key, entry.id))
+        for t in entry.trigrams:
+            self._postings.setdefault(t, set()).add(entry.id)
+
+    def _remove_ids(self, ids: Iterable[int]) -> None:
+        for id_ in ids:
+            entry = self._entries.pop(id_, None)
+            if entry is None:
+                continue
+            self._discard(self._names, (entry.key, entry.id))
+            if entry.capital_key:
+                self._discard(self._capitals, (entry.capital_key, entry.id))
+            for t in entry.trigrams:
+                ids_for = self._postings.get(t)
+                if ids_for is not None:
+                    ids_for.discard(entry.id)
+                    if not ids_for:
+                        del self._postings[t]
+
+    @staticmethod
+    def _discard(arr: List[Tuple[str, int]], item: Tuple[str, int]) -> None:
+        i = bisect_left(arr, item)
+        if i < len(arr) and arr[i] == item:
+            del arr[i]
+
+    @staticmethod
+    def _prefixed(arr: List[Tuple[str, int]], prefix: str, limit: int) -> List[Tuple[str, int]]:
+        out = []
+        i = bisect_left(arr, (prefix, -1))
+        while i < len(arr) and len(out) < limit and arr[i][0].startswith(prefix):
+            out.append(arr[i])
+            i += 1
+        return out
+
+    def search(self, q: str, limit: int = 10) -> List[dict]:
+        qk = search_key(q)
+        if not qk:
+            return []
+        with self._lock:
+            # (tier, -score, key) ranks exact > name prefix > capital prefix > fuzzy
+            ranked: Dict[int, Tuple[int, float, str, str]] = {}
+
+            def offer(id_: int, tier: int, score: float, match: str) -> None:
+                key = (tier, -score, self._entries[id_].key, match)
+                if id_ not in ranked or key < ranked[id_]:
+                    ranked[id_] = key
+
+            for key, id_ in self._prefixed(self._names, qk, limit):
+                offer(id_, 0 if key == qk else 1, len(qk) / len(key), "name")
+            for key, id_ in self._prefixed(self._capitals, qk, limit):
+                offer(id_, 2, len(qk) / len(key), "capital")
+
+            if len(ranked) < limit:
+                q_tri = trigrams(qk)
+                shared = Counter(id_ for t in q_tri for id_ in self._postings.get(t, ()))
+                for id_, n in shared.items():
+                    sim = n / (len(q_tri) + len(self._entries[id_].trigrams) - n)
+                    if sim >= MIN_SIMILARITY:
+                        offer(id_, 3, sim, "fuzzy")
+
+            best = sorted(ranked.items(), key=lambda kv: kv[1])[:limit]
+            results = []
+            for id_, (_, neg_score, _, match) in best:
+                e = self._entries[id_]
+                results.append({
+                    "id": e.id,
+                    "name": e.name,
+                    "capital": e.capital,
+                    "region": e.region,
+                    "match": match,
+                    "score": round(-neg_score, 4),
+                })
+            return results
+
+search_index = SearchIndex()
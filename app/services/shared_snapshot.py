@@ -0,0 +1,310 @@
+"""
+Immutable, memory-mapped snapshot of the countries table shared by every
+worker on a host.
+
+Writers (refresh, delete) rebuild the whole file and swap it in with an
+atomic rename; readers mmap the current file, so all workers share one copy
+of the data in the page cache and decode values straight out of it. A
+snapshot is only served while its generation equals the one in meta, so
+readers never see data older than the validators memo.
+
+Layout (little-endian, every section 8-byte aligned):
+    header      magic, format version, generation, row count, ranked-GDP row count,
+                string table size
+    int64       id, population
+    float64     exchange_rate, estimated_gdp (NaN = NULL), last_refreshed_at (epoch, NaN = NULL)
+    uint32[2]   (offset, length) into the string table per string column; NULL = 0xFFFFFFFF
+    uint32      row permutations: by (name_key, id) and by (estimated_gdp, id) over non-NULL GDP
+    bytes       UTF-8 string table
+Rows are stored in id order, which is also the default listing order.
+"""
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import run_sync, session_scope
+from app.models.country import Country
+from app.services.listing import COUNTRY_KEYS, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.services.http_cache import load_validators
+from app.services.meta import get_meta
+
+MAGIC = b"CSNP"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sIQII")
+_HEADER_SIZE = 64
+_NULL = 0xFFFFFFFF
+
+_INT_COLUMNS = ("id", "population")
+_FLOAT_COLUMNS = ("exchange_rate", "estimated_gdp", "last_refreshed_at")
+_STR_COLUMNS = ("name", "capital", "region", "currency_code", "flag_url", "name_key", "region_key", "currency_key")
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+def _layout(rows: int) -> Tuple[Dict[str, int], int]:
+    """Byte offset of every section for `rows` rows, and where the string table starts."""
+    offsets: Dict[str, int] = {}
+    pos = _HEADER_SIZE
+    for name in _INT_COLUMNS + _FLOAT_COLUMNS:
+        offsets[name] = pos
+        pos = _align(pos + 8 * rows)
+    for name in _STR_COLUMNS:
+        offsets[name] = pos
+        pos = _align(pos + 8 * rows)
+    for name in ("by_name", "by_gdp"):
+        offsets[name] = pos
+        pos = _align(pos + 4 * rows)
+    return offsets, pos
+
+def _epoch(v: Optional[datetime]) -> float:
+    if v is None:
+        return math.nan
+    return (v.replace(tzinfo=timezone.utc) if v.tzinfo is None else v).timestamp()
+
+def build_snapshot(db: Session) -> bytes:
+    """Serialize the table and the meta generation it corresponds to."""
+    meta = get_meta(db)
+    generation = meta.generation if meta else 0
+    columns = [getattr(Country, k) for k in _INT_COLUMNS + _FLOAT_COLUMNS + _STR_COLUMNS]
+    rows = db.execute(select(*columns).order_by(Country.id)).all()
+    n = len(rows)
+    offsets, strings_at = _layout(n)
+
+    ints = [[r[i] or 0 for r in rows] for i in range(len(_INT_COLUMNS))]
+    base = len(_INT_COLUMNS)
+    floats = [
+        [_epoch(r[base + i]) if name == "last_refreshed_at" else (math.nan if r[base + i] is None else float(r[base + i])) for r in rows]
+        for i, name in enumerate(_FLOAT_COLUMNS)
+    ]
+    base += len(_FLOAT_COLUMNS)
+
+    table = bytearray()
+    interned: Dict[str, Tuple[int, int]] = {}
+    refs: List[List[int]] = []
+    for i in range(len(_STR_COLUMNS)):
+        col: List[int] = []
+        for r in rows:
+            v = r[base + i]
+            if v is None:
+                col += (_NULL, 0)
+                continue
+            ref = interned.get(v)
+            if ref is None:
+                data = v.encode()
+                ref = interned[v] = (len(table), len(data))
+                table += data
+            col += ref
+        refs.append(col)
+
+    name_key_i = base + _STR_COLUMNS.index("name_key")
+    gdp_i = len(_INT_COLUMNS) + _FLOAT_COLUMNS.index("estimated_gdp")
+    by_name = sorted(range(n), key=lambda j: (rows[j][name_key_i], rows[j][0]))
+    by_gdp = sorted((j for j in range(n) if rows[j][gdp_i] is not None), key=lambda j: (rows[j][gdp_i], rows[j][0]))
+
+    buf = bytearray(strings_at + len(table))
+    _HEADER.pack_into(buf, 0, MAGIC, FORMAT_VERSION, generation, n, len(by_gdp))
+    struct.pack_into("<I", buf, _HEADER.size, len(table))
+    for name, values in zip(_INT_COLUMNS, ints):
+        struct.pack_into(f"<{n}q", buf, offsets[name], *values)
+    for name, values in zip(_FLOAT_COLUMNS, floats):
+        struct.pack_into(f"<{n}d", buf, offsets[name], *values)
+    for name, values in zip(_STR_COLUMNS, refs):
+        struct.pack_into(f"<{2 * n}I", buf, offsets[name], *values)
+    struct.pack_into(f"<{n}I", buf, offsets["by_name"], *by_name)
+    struct.pack_into(f"<{len(by_gdp)}I", buf, offsets["by_gdp"], *by_gdp)
+    buf[strings_at:] = table
+    return bytes(buf)
+
+def _path() -> Path:
+    return Path(settings.SHARED_SNAPSHOT_PATH)
+
+def publish_snapshot(db: Session) -> None:
+    """Rebuild the snapshot from `db` and atomically replace the shared file (no-op when disabled)."""
+    if not settings.SHARED_SNAPSHOT_ENABLED:
+        return
+    data = build_snapshot(db)
+    path = _path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+class Snapshot:
+    """Read-only view over one mapped snapshot file; values are decoded on access."""
+
+    def __init__(self, buf: mmap.mmap, stat_key: Tuple[int, int, int]):
+        magic, version, self.generation, self.rows, gdp_ranked = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a country snapshot")
+        self.stat_key = stat_key
+        (strings_len,) = struct.unpack_from("<I", buf, _HEADER.size)
+        offsets, strings_at = _layout(self.rows)
+        view = memoryview(buf)
+        n = self.rows
+        self._cols: Dict[str, Any] = {}
+        for name in _INT_COLUMNS:
+            self._cols[name] = view[offsets[name]:offsets[name] + 8 * n].cast("q")
+        for name in _FLOAT_COLUMNS:
+            self._cols[name] = view[offsets[name]:offsets[name] + 8 * n].cast("d")
+        for name in _STR_COLUMNS:
+            self._cols[name] = view[offsets[name]:offsets[name] + 8 * n].cast("I")
+        self._by_name = view[offsets["by_name"]:offsets["by_name"] + 4 * n].cast("I")
+        self._by_gdp = view[offsets["by_gdp"]:offsets["by_gdp"] + 4 * gdp_ranked].cast("I")
+        self._strings = view[strings_at:strings_at + strings_len]
+
+    def _str(self, column: str, j: int) -> Optional[str]:
+        refs = self._cols[column]
+        off = refs[2 * j]
+        if off == _NULL:
+            return None
+        return str(self._strings[off:off + refs[2 * j + 1]], "utf-8")
+
+    def value(self, key: str, j: int) -> Any:
+        if key in _STR_COLUMNS:
+            return self._str(key, j)
+        v = self._cols[key][j]
+        if key in _FLOAT_COLUMNS:
+            if math.isnan(v):
+                return None
+            if key == "last_refreshed_at":
+                return datetime.fromtimestamp(v, tz=timezone.utc)
+        return v
+
+    def row(self, j: int, keys: Sequence[str] = COUNTRY_KEYS) -> tuple:
+        return tuple(self.value(k, j) for k in keys)
+
+    def find(self, name_key: str) -> Optional[int]:
+        """Row index for a name_key, by binary search over the name permutation."""
+        order = self._by_name
+        lo, hi = 0, self.rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._str("name_key", order[mid]) < name_key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.rows and self._str("name_key", order[lo]) == name_key:
+            return order[lo]
+        return None
+
+    def _segments(self, sort: Optional[str]) -> List[Tuple[Sequence[int], Tuple[str, ...], bool]]:
+        """(row order, cursor keys, descending) per phase, matching listing._segments."""
+        ids = self._cols["id"]
+        if sort in ("gdp_desc", "gdp_asc"):
+            ranked = set(self._by_gdp)
+            nulls = [j for j in range(self.rows) if j not in ranked]
+            desc = sort == "gdp_desc"
+            ranked_order = self._by_gdp[::-1] if desc else self._by_gdp
+            return [(ranked_order, ("estimated_gdp", "id"), desc), (nulls, ("id",), False)]
+        if sort in ("name_asc", "name_desc"):
+            desc = sort == "name_desc"
+            return [(self._by_name[::-1] if desc else self._by_name, ("name_key", "id"), desc)]
+        return [(range(len(ids)), ("id",), False)]
+
+    def select(
+        self,
+        region_key: Optional[str] = None,
+        currency_key: Optional[str] = None,
+        sort: Optional[str] = None,
+        keys: Sequence[str] = COUNTRY_KEYS,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[list, Optional[str]]:
+        """Same rows and cursors as listing.select_countries, served from the mapping."""
+        segments = self._segments(sort)
+        paged = limit is not None or cursor is not None
+        limit = (limit or MAX_PAGE_SIZE) if paged else None
+        phase, after = decode_cursor(cursor, sort) if cursor else (0, None)
+
+        picked: List[Tuple[int, int]] = []
+        for i in range(phase, len(segments)):
+            order, sort_keys, desc = segments[i]
+            bound = tuple(after) if after is not None and i == phase else None
+            for j in order:
+                if region_key and self._str("region_key", j) != region_key:
+                    continue
+                if currency_key and self._str("currency_key", j) != currency_key:
+                    continue
+                if bound is not None:
+                    k = tuple(self.value(c, j) for c in sort_keys)
+                    if (k >= bound) if desc else (k <= bound):
+                        continue
+                picked.append((i, j))
+                if limit is not None and len(picked) > limit:
+                    break
+            if limit is not None and len(picked) > limit:
+                break
+
+        if limit is None or len(picked) <= limit:
+            return [self.row(j, keys) for _, j in picked], None
+        picked = picked[:limit]
+        seg_index, last = picked[-1]
+        values = [self.value(c, last) for c in segments[seg_index][1]]
+        return [self.row(j, keys) for _, j in picked], encode_cursor(sort, seg_index, values)
+
+_current: Optional[Snapshot] = None
+_lock = threading.Lock()
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+def current_snapshot(generation: int) -> Optional[Snapshot]:
+    """
+    The mapped snapshot for `generation`, remapping when the file on disk was
+    swapped; None when disabled or when no snapshot matches (callers then
+    read from the database).
+    """
+    global _current
+    if not settings.SHARED_SNAPSHOT_ENABLED:
+        return None
+    snap = _current
+    if snap is not None and snap.generation == generation:
+        return snap
+    try:
+        st = os.stat(_path())
+    except OSError:
+        return None
+    if snap is not None and snap.stat_key == _stat_key(st):
+        return None  # not republished yet
+    with _lock:
+        if _current is not None and _current.stat_key == _stat_key(st):
+            snap = _current
+        else:
+            try:
+                with open(_path(), "rb") as f:
+                    # fstat the opened file: it may have been swapped again since stat()
+                    key = _stat_key(os.fstat(f.fileno()))
+                    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                snap = Snapshot(buf, key)
+            except (OSError, ValueError, struct.error):
+                return None
+            # The previous mapping is released once in-flight readers drop it
+            _current = snap
+    return snap if snap.generation == generation else None
+
+async def ensure_published() -> None:
+    """Publish at startup when no snapshot matches the current generation."""
+    if not settings.SHARED_SNAPSHOT_ENABLED:
+        return
+    async with session_scope() as db:
+        v = await load_validators(db)
+        if current_snapshot(v.generation) is None:
+            await run_sync(db, publish_snapshot)
@@ -0,0 +1,228 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.country import Country
+from app.models.snapshot import CountrySnapshot, RefreshRun
+from app.services.meta import get_meta
+from app.utils.encoding import format_utc
+
+SNAPSHOT_KEYS = ("refresh_id", "captured_at", "population", "currency_code", "exchange_rate", "estimated_gdp")
+
+def _utc(v: datetime) -> datetime:
+    return v.replace(tzinfo=timezone.utc) if v.tzinfo is None else v.astimezone(timezone.utc)
+
+# Country columns copied into each snapshot, in country_snapshots column order
+_CAPTURED = (
+    "population", "currency_code", "exchange_rate", "estimated_gdp",
+    "name", "name_key", "capital", "region", "region_key", "flag_url",
+)
+
+def _insert_snapshots(
+    db: Session, country_ids: Sequence[int], now: datetime, refresh_id: Optional[int], deleted: bool
+) -> None:
+    """Copy the given countries' current rows into snapshots, one INSERT ... SELECT per chunk."""
+    snap = CountrySnapshot.__table__
+    head = (
+        literal(refresh_id, snap.c.refresh_id.type),
+        Country.id,
+        literal(now, snap.c.captured_at.type),
+        literal(deleted, snap.c.deleted.type),
+    )
+    for i in range(0, len(country_ids), 500):
+        db.execute(
+            insert(snap).from_select(
+                ["refresh_id", "country_id", "captured_at", "deleted", *_CAPTURED],
+                select(*head, *(getattr(Country, c) for c in _CAPTURED))
+                .where(Country.id.in_(country_ids[i:i + 500])),
+            )
+        )
+
+def record_refresh_run(db: Session, now: datetime, inserted: int, changed: int) -> int:
+    """Log a refresh that wrote rows; returns the run id its snapshots hang off."""
+    run = RefreshRun(refreshed_at=now, inserted=inserted, changed=changed)
+    db.add(run)
+    db.flush()
+    return run.id
+
+def record_snapshots(db: Session, country_ids: Sequence[int], now: datetime, refresh_id: Optional[int] = None) -> None:
+    """
+    Snapshot the given countries as just written (call after the INSERT or
+    UPDATE, in the same transaction). Rows are picked by id rather than by
+    last_refreshed_at: DATETIME columns may not keep the microseconds of `now`.
+    """
+    _insert_snapshots(db, country_ids, now, refresh_id, deleted=False)
+
+def record_deletions(db: Session, country_ids: Sequence[int], now: datetime) -> None:
+    """
+    Tombstone countries that are about to be deleted (call before the
+    DELETE, in the same transaction) so as_of queries drop them from `now` on.
+    """
+    _insert_snapshots(db, country_ids, now, None, deleted=True)
+
+def _day_start(v: datetime) -> datetime:
+    return _utc(v).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _expire_snapshots(db: Session, horizon: datetime, limit: int) -> int:
+    """
+    Drop up to `limit` snapshots captured before `horizon`, except each live
+    country's latest one: unchanged countries are only snapshotted when they
+    change, so that row is still their state as of any later time. Refresh
+    runs go once no snapshot references them (the FK cascades).
+    """
+    snap = CountrySnapshot.__table__
+    runs = RefreshRun.__table__
+    latest = (
+        select(snap.c.country_id, func.max(snap.c.captured_at).label("captured_at"))
+        .where(snap.c.captured_at < horizon)
+        .group_by(snap.c.country_id)
+        .subquery()
+    )
+    survivor = and_(
+        snap.c.country_id == latest.c.country_id,
+        snap.c.captured_at == latest.c.captured_at,
+        snap.c.deleted.is_(False),
+    )
+    expired = db.execute(
+        select(snap.c.id)
+        .select_from(snap.outerjoin(latest, survivor))
+        .where(snap.c.captured_at < horizon, latest.c.country_id.is_(None))
+        .order_by(snap.c.captured_at)
+        .limit(limit)
+    ).scalars().all()
+    for i in range(0, len(expired), 500):
+        db.execute(delete(snap).where(snap.c.id.in_(expired[i:i + 500])))
+    db.execute(
+        delete(runs).where(
+            runs.c.refreshed_at < horizon,
+            ~select(snap.c.id).where(snap.c.refresh_id == runs.c.id).exists(),
+        )
+    )
+    return len(expired)
+
+def compact_snapshots(db: Session, now: datetime) -> int:
+    """
+    Retention: snapshots younger than SNAPSHOT_FULL_RETENTION_DAYS are kept
+    as-is; older ones are downsampled to the last snapshot per country per
+    UTC day; anything older than SNAPSHOT_MAX_RETENTION_DAYS (if > 0) is
+    dropped, except each country's latest snapshot. Each call expires and
+    downsamples at most SNAPSHOT_COMPACTION_BATCH_SIZE snapshots; downsampling
+    resumes from meta.snapshots_compacted_through and covers whole days (a
+    single larger day is still taken whole), so a backlog is worked off
+    over successive refreshes. Returns the number of rows deleted.
+    """
+    snap = CountrySnapshot.__table__
+    deleted = 0
+
+    if settings.SNAPSHOT_MAX_RETENTION_DAYS > 0:
+        horizon = now - timedelta(days=settings.SNAPSHOT_MAX_RETENTION_DAYS)
+        deleted += _expire_snapshots(db, horizon, settings.SNAPSHOT_COMPACTION_BATCH_SIZE)
+
+    # Whole UTC days only, so a day is never split across two passes
+    cutoff = _day_start(now - timedelta(days=settings.SNAPSHOT_FULL_RETENTION_DAYS))
+    meta = get_meta(db)
+    start = _utc(meta.snapshots_compacted_through) if meta and meta.snapshots_compacted_through else None
+    if start is not None and start >= cutoff:
+        return deleted
+    scope = [snap.c.captured_at < cutoff]
+    if start is not None:
+        scope.append(snap.c.captured_at >= start)
+
+    batch = settings.SNAPSHOT_COMPACTION_BATCH_SIZE
+    times = db.execute(
+        select(snap.c.captured_at).where(*scope).order_by(snap.c.captured_at).limit(batch + 1)
+    ).scalars().all()
+    end = cutoff
+    if len(times) > batch:
+        end = _day_start(times[-1])
+        if end <= _day_start(times[0]):
+            end += timedelta(days=1)
+        scope[0] = snap.c.captured_at < end
+
+    rows = db.execute(
+        select(snap.c.id, snap.c.country_id, snap.c.captured_at)
+        .where(*scope)
+        .order_by(snap.c.country_id, snap.c.captured_at.desc(), snap.c.id.desc())
+    ).all()
+
+    keep: Dict[Tuple[int, object], int] = {}
+    drop: List[int] = []
+    for id_, country_id, captured_at in rows:
+        bucket = (country_id, _utc(captured_at).date())
+        if bucket in keep:
+            drop.append(id_)
+        else:
+            keep[bucket] = id_
+    for i in range(0, len(drop), 500):
+        db.execute(delete(snap).where(snap.c.id.in_(drop[i:i + 500])))
+    if meta is not None:
+        meta.snapshots_compacted_through = end
+    return deleted + len(drop)
+
+def load_history(
+    db: Session,
+    country_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[dict]:
+    """Snapshots of one country in [start, end], oldest first (index range scan)."""
+    stmt = select(
+        CountrySnapshot.refresh_id,
+        CountrySnapshot.captured_at,
+        CountrySnapshot.population,
+        CountrySnapshot.currency_code,
+        CountrySnapshot.exchange_rate,
+        CountrySnapshot.estimated_gdp,
+    ).where(CountrySnapshot.country_id == country_id)
+    if start is not None:
+        stmt = stmt.where(CountrySnapshot.captured_at >= _utc(start))
+    if end is not None:
+        stmt = stmt.where(CountrySnapshot.captured_at <= _utc(end))
+    rows = db.execute(stmt.order_by(CountrySnapshot.captured_at)).all()
+    return [
+        {**dict(zip(SNAPSHOT_KEYS, row)), "captured_at": format_utc(row.captured_at)}
+        for row in rows
+    ]
+
+def select_as_of(db: Session, as_of: datetime, region_key: Optional[str] = None) -> list:
+    """
+    Country rows (CountryOut column order, plus name_key) as they were at
+    `as_of`, read from each country's latest snapshot <= as_of alone, so
+    countries deleted since still show up. last_refreshed_at is the
+    snapshot's capture time.
+    """
+    latest = (
+        select(CountrySnapshot.country_id, func.max(CountrySnapshot.captured_at).label("captured_at"))
+        .where(CountrySnapshot.captured_at <= _utc(as_of))
+        .group_by(CountrySnapshot.country_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            CountrySnapshot.country_id.label("id"),
+            CountrySnapshot.name,
+            CountrySnapshot.capital,
+            CountrySnapshot.region,
+            CountrySnapshot.population,
+            CountrySnapshot.currency_code,
+            CountrySnapshot.exchange_rate,
+            CountrySnapshot.estimated_gdp,
+            CountrySnapshot.flag_url,
+            CountrySnapshot.captured_at,
+            CountrySnapshot.name_key,
+        )
+        .join(
+            latest,
+            and_(
+                CountrySnapshot.country_id == latest.c.country_id,
+                CountrySnapshot.captured_at == latest.c.captured_at,
+            ),
+        )
+        .where(CountrySnapshot.deleted.is_(False), CountrySnapshot.name.is_not(None))
+    )
+    if region_key:
+        stmt = stmt.where(CountrySnapshot.region_key == region_key)
+    return db.execute(stmt).all()
@@ -0,0 +1,155 @@
+import hashlib
+import math
+from array import array
+from dataclasses import dataclass, field
+from random import Random
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.utils.text import normalize_key
+
+# Upstream-derived fields that feed content_hash (estimated_gdp is derived from these)
+HASHED_FIELDS = (
+    "name",
+    "capital",
+    "region",
+    "population",
+    "currency_code",
+    "exchange_rate",
+    "flag_url",
+)
+
+_MULTIPLIERS = range(1000, 2001)
+_NO_RATE = math.nan
+
+@dataclass
+class CountryColumns:
+    """
+    Normalized upstream payload in columnar form, one entry per unique
+    name_key. Numeric columns are `array`-backed; a missing or zero
+    exchange rate is stored as NaN.
+    """
+    name_key: List[str] = field(default_factory=list)
+    name: List[str] = field(default_factory=list)
+    capital: List[Optional[str]] = field(default_factory=list)
+    region: List[Optional[str]] = field(default_factory=list)
+    region_key: List[Optional[str]] = field(default_factory=list)
+    population: array = field(default_factory=lambda: array("q"))
+    currency_code: List[Optional[str]] = field(default_factory=list)
+    currency_key: List[Optional[str]] = field(default_factory=list)
+    exchange_rate: array = field(default_factory=lambda: array("d"))
+    flag_url: List[Optional[str]] = field(default_factory=list)
+    content_hash: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.name_key)
+
+    def rate(self, i: int) -> Optional[float]:
+        r = self.exchange_rate[i]
+        return None if math.isnan(r) else r
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return {
+            "name": self.name[i],
+            "name_key": self.name_key[i],
+            "capital": self.capital[i],
+            "region": self.region[i],
+            "region_key": self.region_key[i],
+            "population": self.population[i],
+            "currency_code": self.currency_code[i],
+            "currency_key": self.currency_key[i],
+            "exchange_rate": self.rate(i),
+            "flag_url": self.flag_url[i],
+            "content_hash": self.content_hash[i],
+        }
+
+def _extract_currency_code(country: Dict[str, Any]) -> Optional[str]:
+    """Extract the first currency code from the country payload"""
+    currencies = country.get("currencies")
+    if not isinstance(currencies, list) or not currencies:
+        return None
+    first = currencies[0] or {}
+    code = first.get("code")
+    if code and isinstance(code, str) and code.strip():
+        return code.strip().upper()
+    return None
+
+def _safe_float(val) -> Optional[float]:
+    try:
+        if val is None:
+            return None
+        return float(val)
+    except Exception:
+        return None
+
+def _content_hash(values: Sequence[Any]) -> str:
+    return hashlib.blake2b(repr(tuple(values)).encode(), digest_size=16).hexdigest()
+
+def transform(countries_payload: List[Dict[str, Any]], rates_map: Dict[str, float]) -> CountryColumns:
+    """
+    Upstream payload -> CountryColumns. Records without a usable name are
+    dropped and duplicate name_keys keep the last record. The currency join
+    resolves each distinct code against rates_map once.
+    """
+    records: Dict[str, tuple] = {}
+    for c in countries_payload:
+        name = (c.get("name") or "").strip()
+        if not name:
+            continue
+        name_key = normalize_key(name)
+        if not name_key:
+            continue
+        records[name_key] = (
+            name,
+            c.get("capital") or None,
+            c.get("region") or None,
+            int(c.get("population") or 0),
+            _extract_currency_code(c),
+            c.get("flag") or None,
+        )
+
+    cols = CountryColumns()
+    if not records:
+        return cols
+    cols.name_key = list(records)
+    names, capitals, regions, populations, codes, flags = zip(*records.values())
+    cols.name = list(names)
+    cols.capital = list(capitals)
+    cols.region = list(regions)
+    cols.population = array("q", populations)
+    cols.currency_code = list(codes)
+    cols.flag_url = list(flags)
+
+    # Normalization and the currency join run once per distinct value
+    region_keys = {r: normalize_key(r) for r in set(regions)}
+    currency_keys = {c: normalize_key(c) for c in set(codes)}
+    rate_by_code = {}
+    for code in currency_keys:
+        rate = _safe_float(rates_map.get(code)) if code is not None else None
+        rate_by_code[code] = rate if rate not in (None, 0.0) else _NO_RATE
+    cols.region_key = [region_keys[r] for r in regions]
+    cols.currency_key = [currency_keys[c] for c in codes]
+    cols.exchange_rate = array("d", [rate_by_code[c] for c in codes])
+
+    rates = [None if math.isnan(r) else r for r in cols.exchange_rate]
+    cols.content_hash = [
+        _content_hash(values)
+        for values in zip(cols.name, cols.capital, cols.region, cols.population, cols.currency_code, rates, cols.flag_url)
+    ]
+    return cols
+
+def multiplier_source(seed: Optional[int] = None) -> Random:
+    """GDP multiplier generator; pass a seed for reproducible refreshes."""
+    return Random(seed)
+
+def estimate_gdp(cols: CountryColumns, indices: Sequence[int], rng: Random) -> List[Optional[float]]:
+    """
+    estimated_gdp for the given rows in one pass: population * U[1000, 2000]
+    / exchange_rate; 0 when the country has no currency and None when its
+    currency has no usable rate.
+    """
+    multipliers = rng.choices(_MULTIPLIERS, k=len(indices))
+    population, rate, codes = cols.population, cols.exchange_rate, cols.currency_code
+    return [
+        0.0 if codes[i] is None else (None if math.isnan(rate[i]) else population[i] * m / rate[i])
+        for i, m in zip(indices, multipliers)
+    ]
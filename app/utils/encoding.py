@@ -0,0 +1,34 @@
+import json
+from datetime import datetime, timezone
+from typing import Any, Iterable, Sequence
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+def format_utc(v: datetime | None) -> str | None:
+    """Same rendering as the schemas' `_ser_z` serializers."""
+    if v is None:
+        return None
+    if v.tzinfo is None:
+        v = v.replace(tzinfo=timezone.utc)
+    else:
+        v = v.astimezone(timezone.utc)
+    return v.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, matching what Pydantic's dump_json emits."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+def rows_to_dicts(keys: Sequence[str], rows: Iterable[Sequence[Any]], ts_key: str = "last_refreshed_at") -> list:
+    """Zip plain row tuples into dicts, formatting the timestamp column."""
+    out = []
+    for row in rows:
+        item = dict(zip(keys, row))
+        if ts_key in item:
+            item[ts_key] = format_utc(item[ts_key])
+        out.append(item)
+    return out
@@ -0,0 +1,224 @@
+"""
+End-to-end benchmark / load test for the FastAPI app.
+
+Runs the real `app` (lifespan, middleware, routers) in-process through
+httpx's ASGI transport, with restcountries/open.er-api replaced by the
+local stub in bench.stub_upstream. For every payload size it measures:
+
+  - refresh: cold (empty table), warm (unchanged upstream, 304s) and
+    changed (every record differs), end to end and per phase
+  - GET /countries for every region/currency/sort combination (paged),
+    plus one unpaginated listing
+  - GET /countries/{name}, /status and /countries/image
+
+and reports throughput and p50/p95/p99 per scenario. The database is
+dropped and recreated for every size, so point --database-url at a
+dedicated schema when benchmarking MySQL/Postgres.
+
+    python -m bench.bench_api [--sizes 250 10000 100000] [--requests 200]
+        [--concurrency 1] [--database-url URL] [--db-async]
+        [--response-cache] [--out results.json]
+
+Compare two result files with `python -m bench.compare old.json new.json`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import product
+from random import Random
+from typing import Any, Dict, List, Optional
+
+from bench.stub_upstream import StubUpstream
+
+REGIONS = (None, "Africa")
+CURRENCIES = (None, "USD")
+SORTS = (None, "gdp_desc", "gdp_asc", "name_asc", "name_desc")
+
+def summarize(samples: List[float], wall: float, errors: int = 0) -> Dict[str, Any]:
+    s = sorted(samples)
+
+    def pct(p: float) -> float:
+        return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))] * 1e3 if s else 0.0
+
+    return {
+        "n": len(s),
+        "errors": errors,
+        "throughput_rps": len(s) / wall if wall else 0.0,
+        "mean_ms": sum(s) / len(s) * 1e3 if s else 0.0,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": s[-1] * 1e3 if s else 0.0,
+    }
+
+async def load(client, urls: List[str], concurrency: int) -> Dict[str, Any]:
+    """Issue `urls` with `concurrency` workers; latency per request and wall-clock throughput."""
+    samples: List[float] = []
+    errors = 0
+    it = iter(urls)
+
+    async def worker():
+        nonlocal errors
+        for url in it:
+            start = time.perf_counter()
+            resp = await client.get(url)
+            samples.append(time.perf_counter() - start)
+            if resp.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - start, errors)
+
+def _listing_url(region: Optional[str], currency: Optional[str], sort: Optional[str], limit: Optional[int]) -> str:
+    params = [f"{k}={v}" for k, v in (("region", region), ("currency", currency), ("sort", sort), ("limit", limit)) if v]
+    return "/countries" + ("?" + "&".join(params) if params else "")
+
+async def bench_size(client, stub: StubUpstream, size: int, args) -> List[Dict[str, Any]]:
+    # Imported after the environment is configured in main()
+    from app.clients import external
+    from app.core.metrics import refresh_phase_duration
+    from app.db import Base, engine
+    from app.services.compression import wait_for_precompute
+    from app.services.http_cache import invalidate_validators
+    from app.services.image import wait_for_render
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    external._payload_cache.clear()
+    invalidate_validators()
+    stub.load(size)
+    results: List[Dict[str, Any]] = []
+
+    async def refresh(scenario: str, runs: int) -> None:
+        before = refresh_phase_duration.totals()
+        samples: List[float] = []
+        errors = 0
+        start = time.perf_counter()
+        for _ in range(runs):
+            t = time.perf_counter()
+            resp = await client.post("/countries/refresh")
+            samples.append(time.perf_counter() - t)
+            errors += resp.status_code >= 400
+            await wait_for_render()  # keep the image phase inside this scenario
+            await wait_for_precompute()
+        row = {"scenario": scenario, **summarize(samples, time.perf_counter() - start, errors)}
+        after = refresh_phase_duration.totals()
+        row["phases_ms"] = {
+            labels[0]: (total - before.get(labels, (0, 0.0))[1]) / runs * 1e3
+            for labels, (count, total) in after.items()
+            if count > before.get(labels, (0, 0.0))[0]
+        }
+        results.append(row)
+
+    await refresh("refresh_cold", 1)
+    await refresh("refresh_warm", args.refreshes)
+    stub.load(size, seed=1)
+    await refresh("refresh_changed", 1)
+
+    for region, currency, sort in product(REGIONS, CURRENCIES, SORTS):
+        url = _listing_url(region, currency, sort, args.page_size)
+        stats = await load(client, [url] * args.requests, args.concurrency)
+        results.append({"scenario": f"list region={region} currency={currency} sort={sort}", **stats})
+    full = max(3, args.requests // 20)
+    results.append({"scenario": "list unpaginated", **await load(client, ["/countries"] * full, args.concurrency)})
+
+    rnd = Random(0)
+    names = [f"/countries/Region {rnd.randrange(size)}" for _ in range(args.requests)]
+    results.append({"scenario": "get_country", **await load(client, names, args.concurrency)})
+    results.append({"scenario": "status", **await load(client, ["/status"] * args.requests, args.concurrency)})
+    results.append({"scenario": "image", **await load(client, ["/countries/image"] * args.requests, args.concurrency)})
+
+    for row in results:
+        row["size"] = size
+    return results
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'size':>7} {'scenario':<52} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>4}")
+    for r in rows:
+        print(f"{r['size']:>7} {r['scenario']:<52} {r['throughput_rps']:>9.1f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>4}")
+        if r.get("phases_ms"):
+            print(" " * 8 + "  ".join(f"{k}={v:.1f}ms" for k, v in sorted(r["phases_ms"].items())))
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+
+    from app.core.config import settings
+    from app.main import app
+
+    stub = StubUpstream().start()
+    os.environ["EXTERNAL_COUNTRIES_URL"] = settings.EXTERNAL_COUNTRIES_URL = f"{stub.base_url}/countries"
+    os.environ["EXTERNAL_RATES_URL"] = settings.EXTERNAL_RATES_URL = f"{stub.base_url}/rates"
+    rows: List[Dict[str, Any]] = []
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                for size in args.sizes:
+                    rows.extend(await bench_size(client, stub, size, args))
+    finally:
+        stub.stop()
+
+    from app.db import engine
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "db_async": settings.DB_ASYNC,
+            "response_cache": args.response_cache,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "page_size": args.page_size,
+        },
+        "results": rows,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 10_000, 100_000])
+    parser.add_argument("--requests", type=int, default=200, help="requests per read scenario")
+    parser.add_argument("--refreshes", type=int, default=3, help="warm refresh runs")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--db-async", action="store_true")
+    parser.add_argument("--response-cache", action="store_true", help="keep the in-process response cache on")
+    parser.add_argument("--out", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the app before importing it
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DB_ASYNC"] = "1" if args.db_async else "0"
+    os.environ["REFRESH_INTERVAL_SECONDS"] = "0"
+    os.environ["REFRESH_GDP_SEED"] = "42"
+    if not args.response_cache:
+        os.environ["CACHE_MAX_ENTRIES"] = "0"
+
+    report = asyncio.run(run(args))
+    print_table(report["results"])
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Serialization benchmark for GET /countries.
+
+Compares the original path (ORM rows -> CountryOut.model_validate -> FastAPI
+response_model re-validation -> JSONResponse) with the row-tuple encoder used
+by the router, and checks that both produce the same bytes.
+
+    python -m bench.bench_serialize [rows] [iterations]
+"""
+import os
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timezone
+from random import Random
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+
+from app.db import Base, SessionLocal, engine
+from app.models.country import Country
+from app.services.listing import COUNTRY_COLUMNS, COUNTRY_KEYS
+from app.schemas.country import CountryOut
+from app.utils.encoding import dumps, rows_to_dicts
+
+def seed(n: int) -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    rnd = Random(0)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(n):
+        rate = rnd.choice([None, 1.0, 0.79, 1550.12, 151.3])
+        pop = rnd.randint(10_000, 1_400_000_000)
+        rows.append({
+            "name": f"Country {i} Ünïcode",
+            "name_key": f"country {i} ünïcode",
+            "capital": f"Capital {i}",
+            "region": rnd.choice(["Africa", "Europe", "Asia", None]),
+            "population": pop,
+            "currency_code": None if rate is None else "XXX",
+            "exchange_rate": rate,
+            "estimated_gdp": None if rate is None else pop * rnd.randint(1000, 2000) / rate,
+            "flag_url": f"https://flagcdn.com/{i}.svg",
+            "last_refreshed_at": now,
+        })
+    with SessionLocal.begin() as db:
+        db.execute(insert(Country.__table__), rows)
+
+_response_adapter = TypeAdapter(List[CountryOut])
+
+def original() -> bytes:
+    with SessionLocal() as db:
+        rows = db.execute(select(Country)).scalars().all()
+        models = [CountryOut.model_validate(r) for r in rows]
+    # what FastAPI does with response_model=List[CountryOut]
+    validated = _response_adapter.validate_python(models, from_attributes=True)
+    content = jsonable_encoder(_response_adapter.dump_python(validated, mode="json"))
+    return JSONResponse(content).body
+
+def fast() -> bytes:
+    with SessionLocal() as db:
+        rows = db.execute(select(*COUNTRY_COLUMNS)).all()
+    return dumps(rows_to_dicts(COUNTRY_KEYS, rows))
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    seed(n)
+
+    assert original() == fast(), "encoded output differs"
+
+    t_orig = min(timeit.repeat(original, number=iterations, repeat=3)) / iterations
+    t_fast = min(timeit.repeat(fast, number=iterations, repeat=3)) / iterations
+    print(f"rows={n} original={t_orig * 1e3:.3f}ms fast={t_fast * 1e3:.3f}ms speedup={t_orig / t_fast:.1f}x")
+
+if __name__ == "__main__":
+    main()
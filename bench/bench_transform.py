@@ -0,0 +1,48 @@
+"""
+Refresh transform-stage benchmark (no database).
+
+Times transform() and estimate_gdp() over synthetic restcountries-shaped
+payloads of increasing size.
+
+    python -m bench.bench_transform [sizes...]
+"""
+import sys
+import timeit
+from random import Random
+from typing import Any, Dict, List, Tuple
+
+from app.services.transform import estimate_gdp, multiplier_source, transform
+
+CURRENCIES = ["USD", "EUR", "NGN", "GBP", "JPY", "XOF", "INR", "BRL", "ZZZ"]
+
+def synthetic_payload(n: int, seed: int = 0) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    rnd = Random(seed)
+    countries = []
+    for i in range(n):
+        code = rnd.choice(CURRENCIES + [None])
+        countries.append({
+            "name": f"Region {i}",
+            "capital": f"Capital {i}",
+            "region": rnd.choice(["Africa", "Americas", "Asia", "Europe", "Oceania"]),
+            "population": rnd.randint(1_000, 1_400_000_000),
+            "flag": f"https://flagcdn.com/{i}.svg",
+            "currencies": [{"code": code}] if code else [],
+        })
+    rates = {c: rnd.uniform(0.5, 1500.0) for c in CURRENCIES if c != "ZZZ"}
+    return countries, rates
+
+def main() -> None:
+    sizes = [int(a) for a in sys.argv[1:]] or [250, 10_000, 100_000]
+    for n in sizes:
+        payload, rates = synthetic_payload(n)
+        number = max(1, 20_000 // n)
+        t_transform = min(timeit.repeat(lambda: transform(payload, rates), number=number, repeat=3)) / number
+        cols = transform(payload, rates)
+        indices = range(len(cols))
+        rng = multiplier_source(42)
+        t_gdp = min(timeit.repeat(lambda: estimate_gdp(cols, indices, rng), number=number, repeat=3)) / number
+        print(f"rows={n} transform={t_transform * 1e3:.2f}ms gdp={t_gdp * 1e3:.2f}ms "
+              f"per_row={(t_transform + t_gdp) / n * 1e6:.2f}us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare two bench_api JSON result files.
+
+Prints throughput and p50/p95/p99 per (size, scenario) with the relative
+change from the baseline; latency increases beyond --threshold percent are
+flagged as regressions and make the exit status non-zero.
+
+    python -m bench.compare baseline.json candidate.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Tuple
+
+def _index(path: str) -> Tuple[Dict[str, Any], Dict[Tuple[int, str], Dict[str, Any]]]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report.get("meta", {}), {(r["size"], r["scenario"]): r for r in report["results"]}
+
+def _delta(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two bench_api result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="p95 regression threshold, percent")
+    args = parser.parse_args()
+
+    old_meta, old = _index(args.baseline)
+    new_meta, new = _index(args.candidate)
+    print(f"baseline {old_meta.get('commit')} ({old_meta.get('database')}) -> "
+          f"candidate {new_meta.get('commit')} ({new_meta.get('database')})")
+    print(f"{'size':>7} {'scenario':<52} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+
+    regressions = 0
+    for key in sorted(old.keys() & new.keys(), key=lambda k: (k[0], k[1])):
+        a, b = old[key], new[key]
+        p95 = _delta(a["p95_ms"], b["p95_ms"])
+        flag = " !" if p95 > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{key[0]:>7} {key[1]:<52} {_delta(a['throughput_rps'], b['throughput_rps']):>+7.1f}% "
+              f"{_delta(a['p50_ms'], b['p50_ms']):>+7.1f}% {p95:>+7.1f}% {_delta(a['p99_ms'], b['p99_ms']):>+7.1f}%{flag}")
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:>7} {key[1]:<52} only in {'baseline' if key in old else 'candidate'}")
+    if regressions:
+        print(f"{regressions} scenario(s) regressed p95 by more than {args.threshold:.0f}%")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
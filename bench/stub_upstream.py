@@ -0,0 +1,87 @@
+"""
+Local stand-in for restcountries and open.er-api.
+
+Serves synthetic payloads (see bench_transform.synthetic_payload) with
+ETag/If-None-Match support, so refresh benchmarks exercise the real HTTP
+client without touching the network. Point the app at it with
+
+    EXTERNAL_COUNTRIES_URL=http://127.0.0.1:8099/countries
+    EXTERNAL_RATES_URL=http://127.0.0.1:8099/rates
+
+    python -m bench.stub_upstream [size] [port]
+"""
+import hashlib
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+from bench.bench_transform import synthetic_payload
+
+class StubUpstream:
+    """Threaded HTTP server whose payload size can be changed between runs."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self._bodies: Dict[str, Tuple[bytes, str]] = {}
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                entry = stub._bodies.get(self.path.split("?", 1)[0])
+                if entry is None:
+                    self.send_error(404)
+                    return
+                body, etag = entry
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def load(self, size: int, seed: int = 0) -> None:
+        countries, rates = synthetic_payload(size, seed)
+        for path, doc in (("/countries", countries), ("/rates", {"result": "success", "rates": rates})):
+            body = json.dumps(doc).encode()
+            self._bodies[path] = (body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"')
+
+    def start(self) -> "StubUpstream":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8099
+    stub = StubUpstream(port=port)
+    stub.load(size)
+    print(f"serving {size} countries at {stub.base_url}/countries and rates at {stub.base_url}/rates")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
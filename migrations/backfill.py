@@ -0,0 +1,139 @@
+"""
+Online, batched backfills for data migrations.
+
+Computing a derived column row by row (one UPDATE per row inside the
+migration's transaction) holds locks for the whole run and costs a round
+trip per row. `backfill` instead walks the table in primary-key order,
+`chunk_size` rows at a time, and writes each chunk with a single
+`UPDATE ... SET col = CASE id WHEN ... END WHERE id IN (...)` (or an
+executemany, see `method`). Chunks are committed as they go, so readers
+and writers only ever wait on one chunk, and a migration that is
+interrupted picks up where it stopped when it is run again: by default
+only rows whose target columns are still NULL are visited.
+
+    from migrations.backfill import backfill
+
+    def upgrade():
+        op.add_column("countries", sa.Column("name_key", sa.String(512), nullable=True))
+        backfill(
+            "countries",
+            source=["name"],
+            target={"name_key": sa.String(512)},
+            compute=lambda row: {"name_key": _norm(row.name)},
+        )
+
+The application must already keep the column current for rows it writes
+(new code first, then the migration); the backfill only covers history.
+Constraints on the filled column (NOT NULL, unique indexes) belong after
+the call. Online migrations only: there is no data to read with --sql.
+"""
+import logging
+import time
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.engine import Connection, Row
+from sqlalchemy.types import TypeEngine
+
+logger = logging.getLogger(__name__)
+
+# Bound parameters per statement; old SQLite builds stop at 999
+MAX_BIND_PARAMS = {"sqlite": 999}
+DEFAULT_MAX_BIND_PARAMS = 30000
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+def _chunk_limit(conn: Connection, chunk_size: int, n_targets: int, method: str) -> int:
+    if method != "case":
+        return chunk_size
+    # WHEN key THEN value per target column, plus the key in the IN list
+    per_row = 2 * n_targets + 1
+    cap = MAX_BIND_PARAMS.get(conn.dialect.name, DEFAULT_MAX_BIND_PARAMS)
+    return max(1, min(chunk_size, cap // per_row))
+
+def _write_case(conn: Connection, t: sa.Table, key: str, types: Mapping[str, TypeEngine], updates: list) -> None:
+    keys = [k for k, _ in updates]
+    values = {
+        col: sa.case(
+            {k: sa.literal(v[col], type_) for k, v in updates},
+            value=t.c[key],
+            else_=t.c[col],
+        )
+        for col, type_ in types.items()
+    }
+    conn.execute(sa.update(t).where(t.c[key].in_(keys)).values(values))
+
+def _write_executemany(conn: Connection, t: sa.Table, key: str, types: Mapping[str, TypeEngine], updates: list) -> None:
+    stmt = sa.update(t).where(t.c[key] == sa.bindparam("row_key"))
+    conn.execute(stmt, [{"row_key": k, **v} for k, v in updates])
+
+def backfill(
+    table_name: str,
+    source: Sequence[str],
+    target: Mapping[str, TypeEngine],
+    compute: Callable[[Row], Mapping[str, Any]],
+    key: str = "id",
+    where: Optional[Callable[[sa.Table], Any]] = None,
+    chunk_size: int = 1000,
+    method: str = "case",
+) -> int:
+    """
+    Fill `target` columns of `table_name` from `compute(row)`, where `row`
+    carries the `source` and current `target` values. Only rows matching
+    `where(table)` are visited (default: any target column IS NULL) and only
+    rows whose values actually change are written. `method` is "case"
+    (one UPDATE per chunk) or "executemany". Returns the number of rows
+    updated.
+    """
+    if method not in ("case", "executemany"):
+        raise ValueError(f"Unknown backfill method: {method}")
+    t = sa.table(
+        table_name,
+        sa.column(key),
+        *(sa.column(c) for c in source if c not in target and c != key),
+        *(sa.column(c, type_) for c, type_ in target.items()),
+    )
+    pending = where(t) if where is not None else sa.or_(*(t.c[c].is_(None) for c in target))
+    columns = [t.c[key], *(t.c[c] for c in source if c != key), *(t.c[c] for c in target if c not in source)]
+    write = _write_case if method == "case" else _write_executemany
+    label = f"{table_name}.{','.join(target)}"
+
+    context = op.get_context()
+    conn = op.get_bind()
+    limit = _chunk_limit(conn, chunk_size, len(target), method)
+
+    # Commit the migration's work so far, then commit chunk by chunk
+    with context.autocommit_block():
+        total = conn.scalar(sa.select(sa.func.count()).select_from(t).where(pending)) or 0
+        logger.info("backfill %s: %d rows to visit, %d per chunk", label, total, limit)
+        started = last_report = time.monotonic()
+        visited = updated = 0
+        last_key = None
+        while True:
+            stmt = sa.select(*columns).where(pending)
+            if last_key is not None:
+                stmt = stmt.where(t.c[key] > last_key)
+            rows = conn.execute(stmt.order_by(t.c[key]).limit(limit)).all()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                values = dict(compute(row))
+                if any(values[c] != row._mapping[c] for c in target):
+                    updates.append((row._mapping[key], {c: values[c] for c in target}))
+            if updates:
+                write(conn, t, key, target, updates)
+            visited += len(rows)
+            updated += len(updates)
+            last_key = rows[-1]._mapping[key]
+
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                last_report = now
+                logger.info(
+                    "backfill %s: %d/%d rows (%.0f%%), %d updated, %.0f rows/s, at %s=%s",
+                    label, visited, total, 100 * visited / max(total, 1), updated,
+                    visited / (now - started), key, last_key,
+                )
+    logger.info("backfill %s: done, %d rows visited, %d updated in %.1fs", label, visited, updated, time.monotonic() - started)
+    return updated
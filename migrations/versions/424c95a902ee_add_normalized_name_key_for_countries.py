@@ -1,8 +1,8 @@
 import sqlalchemy as sa
 import unicodedata
 from alembic import op
-from sqlalchemy import select, update
-from sqlalchemy.sql import table, column
+
+from migrations.backfill import backfill
 
 revision = "424c95a902ee"
 down_revision = "9de61a44c5d0"
@@ -24,25 +24,18 @@ def upgrade():
     if not _has_column("countries", "name_key"):
         op.add_column("countries", sa.Column("name_key", sa.String(length=512), nullable=True))
 
-    countries = table(
+    # Chunked and committed as it goes; re-running resumes at the first NULL name_key
+    backfill(
         "countries",
-        column("id", sa.Integer),
-        column("name", sa.String),
-        column("name_key", sa.String),
+        source=["name"],
+        target={"name_key": sa.String(length=512)},
+        compute=lambda row: {"name_key": _norm(row.name)},
     )
 
-    conn = op.get_bind()
-    rows = conn.execute(select(countries.c.id, countries.c.name)).fetchall()
-    for nid, name in rows:
-        conn.execute(
-            update(countries)
-            .where(countries.c.id == nid)
-            .values(name_key=_norm(name))
-        )
-
-    with op.batch_alter_table("countries", recreate="always") as batch_op:
+    # Only SQLite has to rebuild the table to change nullability; the index never needs it
+    with op.batch_alter_table("countries") as batch_op:
         batch_op.alter_column("name_key", existing_type=sa.String(length=512), nullable=False)
-        batch_op.create_index("ux_countries_name_key", ["name_key"], unique=True)
+    op.create_index("ux_countries_name_key", "countries", ["name_key"], unique=True)
 
 def downgrade():
     with op.batch_alter_table("countries", recreate="always") as batch_op:
@@ -0,0 +1,32 @@
+"""add exchange_rates
+
+Revision ID: a3d7c1e9f5b2
+Revises: f2c7b4d9e8a1
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7c1e9f5b2'
+down_revision: Union[str, None] = 'f2c7b4d9e8a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        "exchange_rates",
+        sa.Column("code", sa.String(length=16), primary_key=True),
+        sa.Column("base", sa.String(length=16), nullable=False),
+        sa.Column("rate", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("exchange_rates")
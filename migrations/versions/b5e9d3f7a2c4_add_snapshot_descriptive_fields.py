@@ -0,0 +1,62 @@
+"""store descriptive fields and tombstones on country_snapshots
+
+Revision ID: b5e9d3f7a2c4
+Revises: a3d7c1e9f5b2
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.backfill import backfill
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e9d3f7a2c4'
+down_revision: Union[str, None] = 'a3d7c1e9f5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DESCRIPTIVE = {
+    "name": sa.String(length=191),
+    "name_key": sa.String(length=512),
+    "capital": sa.String(length=191),
+    "region": sa.String(length=64),
+    "region_key": sa.String(length=64),
+    "flag_url": sa.String(length=512),
+}
+
+
+def upgrade():
+    # Tombstones written on delete have no refresh run
+    with op.batch_alter_table("country_snapshots") as batch_op:
+        batch_op.alter_column("refresh_id", existing_type=sa.Integer(), nullable=True)
+        batch_op.add_column(sa.Column("deleted", sa.Boolean(), nullable=False, server_default=sa.false()))
+        for name, type_ in DESCRIPTIVE.items():
+            batch_op.add_column(sa.Column(name, type_, nullable=True))
+
+    # History of countries that still exist; rows of already-deleted ones stay NULL
+    countries = sa.table("countries", sa.column("id"), *(sa.column(c) for c in DESCRIPTIVE))
+    current = {
+        row.id: {c: row._mapping[c] for c in DESCRIPTIVE}
+        for row in op.get_bind().execute(sa.select(countries)).all()
+    }
+    backfill(
+        "country_snapshots",
+        source=["country_id"],
+        target=DESCRIPTIVE,
+        compute=lambda row: current[row.country_id],
+        where=lambda t: sa.and_(t.c.name.is_(None), t.c.country_id.in_(sa.select(countries.c.id))),
+    )
+
+
+def downgrade():
+    snapshots = sa.table("country_snapshots", sa.column("refresh_id"))
+    op.execute(snapshots.delete().where(snapshots.c.refresh_id.is_(None)))
+    with op.batch_alter_table("country_snapshots", recreate="always") as batch_op:
+        for name in reversed(list(DESCRIPTIVE)):
+            batch_op.drop_column(name)
+        batch_op.drop_column("deleted")
+        batch_op.alter_column("refresh_id", existing_type=sa.Integer(), nullable=False)
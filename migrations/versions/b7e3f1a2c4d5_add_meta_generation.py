@@ -0,0 +1,29 @@
+"""add meta generation and changed_at
+
+Revision ID: b7e3f1a2c4d5
+Revises: 424c95a902ee
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f1a2c4d5'
+down_revision: Union[str, None] = '424c95a902ee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column("meta_cache", sa.Column("generation", sa.Integer(), nullable=False, server_default=sa.text("0")))
+    op.add_column("meta_cache", sa.Column("changed_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("meta_cache") as batch_op:
+        batch_op.drop_column("changed_at")
+        batch_op.drop_column("generation")
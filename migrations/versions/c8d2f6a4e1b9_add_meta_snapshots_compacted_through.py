@@ -0,0 +1,28 @@
+"""add meta_cache.snapshots_compacted_through
+
+Revision ID: c8d2f6a4e1b9
+Revises: b5e9d3f7a2c4
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d2f6a4e1b9'
+down_revision: Union[str, None] = 'b5e9d3f7a2c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # NULL: the next refresh compacts from the oldest snapshot
+    op.add_column("meta_cache", sa.Column("snapshots_compacted_through", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("meta_cache") as batch_op:
+        batch_op.drop_column("snapshots_compacted_through")
@@ -0,0 +1,74 @@
+"""add region_key/currency_key and list indexes
+
+Revision ID: c9a4d2e8f1b3
+Revises: b7e3f1a2c4d5
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9a4d2e8f1b3'
+down_revision: Union[str, None] = 'b7e3f1a2c4d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("ix_countries_region_key_gdp", ["region_key", "estimated_gdp"]),
+    ("ix_countries_currency_key_gdp", ["currency_key", "estimated_gdp"]),
+    ("ix_countries_region_key_name_key", ["region_key", "name_key"]),
+    ("ix_countries_currency_key_name_key", ["currency_key", "name_key"]),
+    ("ix_countries_estimated_gdp", ["estimated_gdp"]),
+)
+
+
+def _norm(s: str | None) -> str | None:
+    if s is None:
+        return None
+    s = s.strip()
+    if not s:
+        return None
+    return unicodedata.normalize("NFKC", s).casefold()
+
+
+def upgrade():
+    op.add_column("countries", sa.Column("region_key", sa.String(length=64), nullable=True))
+    op.add_column("countries", sa.Column("currency_key", sa.String(length=16), nullable=True))
+
+    countries = table(
+        "countries",
+        column("region", sa.String),
+        column("region_key", sa.String),
+        column("currency_code", sa.String),
+        column("currency_key", sa.String),
+    )
+
+    # Few distinct values: one UPDATE per value rather than per row
+    conn = op.get_bind()
+    for src, dst in (("region", "region_key"), ("currency_code", "currency_key")):
+        values = conn.execute(sa.select(countries.c[src]).distinct()).scalars().all()
+        for value in values:
+            if value is None:
+                continue
+            conn.execute(
+                sa.update(countries)
+                .where(countries.c[src] == value)
+                .values({dst: _norm(value)})
+            )
+
+    for name, cols in INDEXES:
+        op.create_index(name, "countries", cols, unique=False)
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name="countries")
+    with op.batch_alter_table("countries") as batch_op:
+        batch_op.drop_column("currency_key")
+        batch_op.drop_column("region_key")
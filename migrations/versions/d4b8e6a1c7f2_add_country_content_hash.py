@@ -0,0 +1,28 @@
+"""add countries.content_hash
+
+Revision ID: d4b8e6a1c7f2
+Revises: c9a4d2e8f1b3
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b8e6a1c7f2'
+down_revision: Union[str, None] = 'c9a4d2e8f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Left NULL: every existing row is rewritten (and hashed) once on the next refresh
+    op.add_column("countries", sa.Column("content_hash", sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("countries") as batch_op:
+        batch_op.drop_column("content_hash")
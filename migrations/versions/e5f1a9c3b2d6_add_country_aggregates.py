@@ -0,0 +1,42 @@
+"""add country_aggregates
+
+Revision ID: e5f1a9c3b2d6
+Revises: d4b8e6a1c7f2
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f1a9c3b2d6'
+down_revision: Union[str, None] = 'd4b8e6a1c7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Populated by the next refresh (or delete)
+    op.create_table(
+        "country_aggregates",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("group_by", sa.String(length=16), nullable=False),
+        sa.Column("group_key", sa.String(length=64), nullable=False),
+        sa.Column("label", sa.String(length=64), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("total_population", sa.BigInteger(), nullable=False),
+        sa.Column("gdp_count", sa.Integer(), nullable=False),
+        sa.Column("gdp_sum", sa.Float(), nullable=False),
+        sa.Column("gdp_avg", sa.Float(), nullable=True),
+        sa.Column("gdp_max", sa.Float(), nullable=True),
+        sa.Column("top", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("group_by", "group_key", name="ux_country_aggregates_group"),
+    )
+
+
+def downgrade():
+    op.drop_table("country_aggregates")
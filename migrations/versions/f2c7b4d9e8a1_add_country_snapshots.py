@@ -0,0 +1,51 @@
+"""add refresh_runs and country_snapshots
+
+Revision ID: f2c7b4d9e8a1
+Revises: e5f1a9c3b2d6
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c7b4d9e8a1'
+down_revision: Union[str, None] = 'e5f1a9c3b2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        "refresh_runs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("inserted", sa.Integer(), nullable=False),
+        sa.Column("changed", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_refresh_runs_refreshed_at", "refresh_runs", ["refreshed_at"], unique=False)
+
+    op.create_table(
+        "country_snapshots",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("refresh_id", sa.Integer(), sa.ForeignKey("refresh_runs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("country_id", sa.Integer(), nullable=False),
+        sa.Column("captured_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("population", sa.BigInteger(), nullable=False),
+        sa.Column("currency_code", sa.String(length=16), nullable=True),
+        sa.Column("exchange_rate", sa.Float(), nullable=True),
+        sa.Column("estimated_gdp", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_country_snapshots_country_captured", "country_snapshots", ["country_id", "captured_at"], unique=False)
+    op.create_index("ix_country_snapshots_captured", "country_snapshots", ["captured_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_country_snapshots_captured", table_name="country_snapshots")
+    op.drop_index("ix_country_snapshots_country_captured", table_name="country_snapshots")
+    op.drop_table("country_snapshots")
+    op.drop_index("ix_refresh_runs_refreshed_at", table_name="refresh_runs")
+    op.drop_table("refresh_runs")
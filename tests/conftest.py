@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a scratch database first
+_TMP = tempfile.mkdtemp(prefix="countries-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_TMP, "test.db")
+os.environ["REFRESH_INTERVAL_SECONDS"] = "0"
+os.environ["REFRESH_GDP_SEED"] = "42"
+os.environ["WARMUP_ENABLED"] = "0"
+os.environ["HTTP_VALIDATORS_TTL_SECONDS"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.clients import external
+from app.db import Base, engine
+from app.main import create_app
+from app.services import http_cache, image, refresh, shared_snapshot
+from app.services.cache import data_changed
+from app.services.rates import rate_table
+from app.services.scheduler import refresh_coordinator
+from app.services.search import search_index
+
+RATES = {"USD": 1.0, "EUR": 0.9, "NGN": 1500.0, "GBP": 0.8}
+
+def make_payload(n: int = 30, seed: int = 0) -> list:
+    currencies = ["USD", "EUR", "NGN", "GBP", None]
+    regions = ["Africa", "Europe", "Asia"]
+    return [
+        {
+            "name": f"Country {i}",
+            "capital": f"Capital {i}",
+            "region": regions[i % len(regions)],
+            "population": 1000 + i * 37 + seed,
+            "flag": f"https://flags.example/{i}.svg",
+            "currencies": [{"code": currencies[i % len(currencies)]}] if currencies[i % len(currencies)] else [],
+        }
+        for i in range(n)
+    ]
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """What the next refresh fetches: set `.countries`, `.rates`, `.stale_sources`."""
+    class Upstream:
+        countries = make_payload()
+        rates = dict(RATES)
+        stale_sources: list = []
+
+    async def fetch():
+        return Upstream.countries, Upstream.rates, list(Upstream.stale_sources)
+
+    monkeypatch.setattr(refresh, "fetch_countries_and_rates", fetch)
+    return Upstream
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, upstream):
+    monkeypatch.chdir(tmp_path)  # cache/ (image, snapshot, fallbacks) per test
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    data_changed()
+    http_cache._seen_generation = None
+    search_index.generation = None
+    rate_table._state = None
+    image._current = image._current_digest = image._pending = None
+    shared_snapshot._current = None
+    external._payload_cache.clear()
+    external._disk_checked.clear()
+    external._breakers.clear()
+    external._serving_stale.clear()
+    refresh_coordinator._current = None  # jobs belong to the previous test's event loop
+    refresh_coordinator._jobs.clear()
+    with TestClient(create_app()) as c:
+        yield c
+        c.portal.call(image.wait_for_render)  # finish writing inside tmp_path
+
+@pytest.fixture
+def seeded(client):
+    resp = client.post("/countries/refresh")
+    assert resp.status_code == 200, resp.text
+    return client
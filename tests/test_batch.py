@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.schemas.batch import MAX_BATCH_NAMES
+
+@pytest.fixture(params=[False, True], ids=["db", "shared-snapshot"])
+def batch(request, monkeypatch, client):
+    monkeypatch.setattr(settings, "SHARED_SNAPSHOT_ENABLED", request.param)
+    assert client.post("/countries/refresh").status_code == 200
+    return client
+
+def test_lookup_reports_found_and_missing(batch):
+    resp = batch.post("/countries/batch", json={"names": ["Country 1", "country 2", "Atlantis"]})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert set(body["found"]) == {"Country 1", "country 2"}
+    assert body["found"]["country 2"]["name"] == "Country 2"
+    assert body["missing"] == ["Atlantis"]
+
+@pytest.mark.parametrize("payload", [
+    {"names": []},
+    {"names": [" "]},
+    {"names": ["x"] * (MAX_BATCH_NAMES + 1)},
+    {},
+])
+def test_lookup_rejects_bad_payload(seeded, payload):
+    resp = seeded.post("/countries/batch", json=payload)
+    assert resp.status_code == 400
+    assert resp.json()["error"] == "Validation failed"
+
+def test_mutate_deletes_and_patches(batch):
+    resp = batch.patch("/countries/batch", json={
+        "delete": ["Country 0"],
+        "update": [{"name": "Country 1", "population": 5, "region": "Oceania"}],
+    })
+    assert resp.status_code == 200
+    assert resp.json() == {"deleted": 1, "updated": 1}
+
+    assert batch.get("/countries/Country 0").status_code == 404
+    patched = batch.get("/countries/Country 1").json()
+    assert (patched["population"], patched["region"]) == (5, "Oceania")
+    assert [c["name"] for c in batch.get("/countries?region=oceania").json()] == ["Country 1"]
+    assert len(batch.get("/countries").json()) == 29
+
+def test_mutate_with_unknown_name_writes_nothing(seeded):
+    resp = seeded.patch("/countries/batch", json={"delete": ["Country 0", "Atlantis"]})
+    assert resp.status_code == 404
+    assert resp.json()["details"]["missing"] == ["Atlantis"]
+    assert seeded.get("/countries/Country 0").status_code == 200
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"delete": [], "update": []},
+    {"update": [{"name": "Country 1", "population": -1}]},
+    {"delete": ["x"] * (MAX_BATCH_NAMES + 1)},
+])
+def test_mutate_rejects_bad_payload(seeded, payload):
+    resp = seeded.patch("/countries/batch", json=payload)
+    assert resp.status_code == 400
+    assert resp.json()["error"] == "Validation failed"
+
+def test_patch_is_recorded_in_history_and_as_of(seeded):
+    before = seeded.get("/countries/Country 1").json()["population"]
+    assert seeded.patch("/countries/batch", json={"update": [{"name": "Country 1", "population": 5}]}).status_code == 200
+    now = datetime.now(timezone.utc).isoformat()
+
+    history = seeded.get("/countries/Country 1/history").json()
+    assert [h["population"] for h in history] == [before, 5]
+    as_of = {c["name"]: c for c in seeded.get("/countries", params={"as_of": now}).json()}
+    assert as_of["Country 1"]["population"] == 5
+    live = {c["name"]: c["population"] for c in seeded.get("/countries").json()}
+    assert {name: c["population"] for name, c in as_of.items()} == live
@@ -0,0 +1,68 @@
+import pytest
+
+from app.routers import countries
+from app.services import compression, image
+from app.services.cache import variant_cache
+from app.services.listing import list_cache_key
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZIP, deflate", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0.0, identity", None),
+    ("*", "gzip"),
+    ("*;q=0", None),
+    ("*, gzip;q=0", None),
+    ("gzip;q=bogus", None),
+])
+def test_negotiate(header, expected):
+    assert compression.negotiate(header, ("gzip",)) == expected
+
+def test_list_served_gzip_with_its_own_etag(seeded):
+    plain = seeded.get("/countries", headers={"Accept-Encoding": "identity"})
+    gz = seeded.get("/countries", headers={"Accept-Encoding": "gzip"})
+    assert plain.headers.get("content-encoding") is None
+    assert gz.headers["content-encoding"] == "gzip"
+    assert plain.headers["vary"] == gz.headers["vary"] == "Accept-Encoding"
+    assert gz.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert gz.json() == plain.json()
+
+    cached = seeded.get("/countries", headers={"Accept-Encoding": "gzip", "If-None-Match": gz.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.headers["vary"] == "Accept-Encoding"
+    # A gzip validator does not revalidate the identity representation
+    assert seeded.get("/countries", headers={"Accept-Encoding": "identity", "If-None-Match": gz.headers["etag"]}).status_code == 200
+
+def test_refusing_gzip_gets_identity(seeded):
+    resp = seeded.get("/countries", headers={"Accept-Encoding": "gzip;q=0"})
+    assert resp.headers.get("content-encoding") is None
+
+def test_small_bodies_stay_identity_and_revalidate(seeded):
+    first = seeded.get("/countries?limit=1&fields=name", headers={"Accept-Encoding": "gzip"})
+    assert first.headers.get("content-encoding") is None
+    assert not first.headers["etag"].endswith('-gzip"')
+    again = seeded.get("/countries?limit=1&fields=name", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+
+def test_refresh_precomputes_list_variants(seeded):
+    seeded.portal.call(compression.wait_for_precompute)
+    for region_key in (None, "africa", "europe", "asia"):
+        assert variant_cache.get(("gzip", list_cache_key(region_key))), region_key
+    assert variant_cache.get(("gzip", list_cache_key(None, "usd")))
+
+def test_image_revalidation_skips_encoding(seeded, monkeypatch):
+    seeded.portal.call(image.wait_for_render)
+    resp = seeded.get("/countries/image", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["vary"] == "Accept-Encoding"
+
+    async def boom(*args):
+        raise AssertionError("encoded a body for a 304")
+
+    monkeypatch.setattr(countries, "encoded_variant", boom)
+    again = seeded.get("/countries/image", headers={"Accept-Encoding": "gzip", "If-None-Match": resp.headers["etag"]})
+    assert again.status_code == 304
+    assert again.headers["etag"] == resp.headers["etag"]
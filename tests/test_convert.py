@@ -0,0 +1,50 @@
+import pytest
+
+from app.schemas.convert import MAX_BATCH_SIZE
+
+def test_convert_before_any_refresh_is_503(client):
+    resp = client.get("/convert?from=USD&to=EUR")
+    assert resp.status_code == 503
+    assert resp.json()["error"] == "Exchange rates unavailable"
+
+def test_convert_cross_rate(seeded):
+    resp = seeded.get("/convert?from=eur&to=NGN&amount=9")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["from"], body["to"], body["amount"], body["base"]) == ("EUR", "NGN", 9, "USD")
+    assert body["rate"] == pytest.approx(1500 / 0.9)
+    assert body["result"] == pytest.approx(15000)
+    assert body["rates_updated_at"].endswith("Z")
+
+@pytest.mark.parametrize("query, field", [
+    ("from=USD&to=XXX", "currency"),
+    ("from=USD&to=EUR&amount=nan", "amount"),
+    ("from=USD&to=EUR&amount=abc", "amount"),
+    ("to=EUR", "from"),
+])
+def test_convert_rejects_bad_query(seeded, query, field):
+    resp = seeded.get(f"/convert?{query}")
+    assert resp.status_code == 400
+    assert resp.json()["error"] == "Validation failed"
+    assert field in resp.json()["details"]
+
+def test_convert_batch(seeded):
+    resp = seeded.post("/convert", json={"items": [
+        {"from": "USD", "to": "GBP", "amount": 10},
+        {"from": "GBP", "to": "GBP", "amount": 3},
+    ]})
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["result"] for r in results] == [pytest.approx(8), pytest.approx(3)]
+    assert [r["from"] for r in results] == ["USD", "GBP"]
+
+@pytest.mark.parametrize("items", [
+    [],
+    [{"from": "USD", "to": "EUR", "amount": 1}] * (MAX_BATCH_SIZE + 1),
+    [{"from": "USD", "to": "XXX", "amount": 1}],
+    [{"from": "USD", "to": "EUR"}],
+])
+def test_convert_batch_rejects_bad_items(seeded, items):
+    resp = seeded.post("/convert", json={"items": items})
+    assert resp.status_code == 400
+    assert resp.json()["error"] == "Validation failed"
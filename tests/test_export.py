@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+@pytest.mark.parametrize("accept, encoded", [
+    ("gzip", True),
+    ("br;q=1, gzip;q=0.5", True),
+    ("*", True),
+    ("gzip;q=0", False),
+    ("identity", False),
+    ("*;q=0", False),
+])
+def test_export_negotiates_gzip(seeded, accept, encoded):
+    resp = seeded.get("/countries/export", headers={"Accept-Encoding": accept})
+    assert resp.status_code == 200
+    assert resp.headers.get("content-encoding") == ("gzip" if encoded else None)
+    assert resp.headers["vary"] == "Accept-Encoding"
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert len(rows) == 30
+
+def test_export_csv_with_fields(seeded):
+    resp = seeded.get("/countries/export?format=csv&fields=name,region&region=Asia", headers={"Accept-Encoding": "identity"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+    lines = resp.text.splitlines()
+    assert lines[0] == "name,region"
+    assert len(lines) == 11 and all(line.endswith(",Asia") for line in lines[1:])
+
+def test_export_rejects_bad_query(seeded):
+    assert seeded.get("/countries/export?fields=nope").status_code == 400
+    assert seeded.get("/countries/export?format=xml").status_code == 400
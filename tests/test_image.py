@@ -0,0 +1,59 @@
+import os
+from datetime import datetime, timezone
+
+from app.services import image
+from tests.conftest import make_payload
+
+def _rendered(client) -> None:
+    client.portal.call(image.wait_for_render)
+
+def test_image_missing_before_first_refresh(client):
+    resp = client.get("/countries/image")
+    assert resp.status_code == 404
+    assert resp.json() == {"error": "Summary image not found"}
+
+def test_image_served_with_validators(seeded):
+    _rendered(seeded)
+    resp = seeded.get("/countries/image")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "image/png"
+    assert resp.content.startswith(b"\x89PNG")
+    again = seeded.get("/countries/image", headers={"If-None-Match": resp.headers["etag"]})
+    assert again.status_code == 304
+
+def test_unchanged_refresh_does_not_rerender(seeded, monkeypatch):
+    _rendered(seeded)
+    etag = seeded.get("/countries/image").headers["etag"]
+    renders = []
+    real = image.render_summary_png
+    monkeypatch.setattr(image, "render_summary_png", lambda *a: renders.append(a) or real(*a))
+
+    assert seeded.post("/countries/refresh").json()["changed"] == 0
+    _rendered(seeded)
+    assert renders == []
+    assert seeded.get("/countries/image").headers["etag"] == etag
+
+def test_render_from_another_worker_is_picked_up(seeded):
+    _rendered(seeded)
+    first = seeded.get("/countries/image")
+    # Another worker's refresh swaps the file in place
+    tmp = image.SUMMARY_PATH.with_suffix(".tmp")
+    tmp.write_bytes(first.content + b"other worker")
+    os.replace(tmp, image.SUMMARY_PATH)
+
+    resp = seeded.get("/countries/image")
+    assert resp.status_code == 200
+    assert resp.content.endswith(b"other worker")
+    assert resp.headers["etag"] != first.headers["etag"]
+
+def test_image_is_stamped_with_the_last_data_change(seeded, upstream):
+    upstream.countries = make_payload(seed=1)
+    assert seeded.post("/countries/refresh").json()["changed"] == 30
+    _rendered(seeded)
+    assert seeded.get("/countries/image").headers["last-modified"] == seeded.get("/countries").headers["last-modified"]
+
+def test_digest_covers_the_drawn_timestamp(client):
+    top5 = [("Country 1", 10.0)]
+    assert image.generate_summary_image(1, top5, datetime(2026, 1, 1, tzinfo=timezone.utc))
+    assert not image.generate_summary_image(1, top5, datetime(2026, 1, 1, tzinfo=timezone.utc))
+    assert image.generate_summary_image(1, top5, datetime(2026, 1, 2, tzinfo=timezone.utc))
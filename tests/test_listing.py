@@ -0,0 +1,63 @@
+import base64
+import json
+
+import pytest
+
+from app.core.config import settings
+
+def _cursor(*parts) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(parts)).encode()).decode().rstrip("=")
+
+def _pages(client, url: str) -> list:
+    names, cursor = [], None
+    while True:
+        resp = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert resp.status_code == 200, resp.text
+        names += [c["name"] for c in resp.json()]
+        cursor = resp.headers.get("x-next-cursor")
+        if not cursor:
+            return names
+
+@pytest.fixture(params=[False, True], ids=["db", "shared-snapshot"])
+def listing(request, monkeypatch, client):
+    monkeypatch.setattr(settings, "SHARED_SNAPSHOT_ENABLED", request.param)
+    assert client.post("/countries/refresh").status_code == 200
+    return client
+
+@pytest.mark.parametrize("sort", [None, "gdp_desc", "gdp_asc", "name_asc", "name_desc"])
+def test_cursor_pages_cover_unpaginated_result(listing, sort):
+    query = f"sort={sort}" if sort else ""
+    full = [c["name"] for c in listing.get(f"/countries?{query}").json()]
+    assert len(full) == 30
+    assert _pages(listing, f"/countries?limit=7&{query}") == full
+
+def test_filters_and_fields(listing):
+    rows = listing.get("/countries?region=africa&currency=USD&fields=name,region").json()
+    assert rows and all(set(r) == {"name", "region"} and r["region"] == "Africa" for r in rows)
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    _cursor("gdp_desc", 0, [{"a": 1}, 2]),
+    _cursor("gdp_desc", 1, [[1]]),
+    _cursor("gdp_desc", -1, [5]),
+    _cursor("gdp_desc", 2, [5]),
+    _cursor("gdp_desc", True, [1.0, 2]),
+    _cursor("gdp_desc", 0, [1.0, "2"]),
+    _cursor("gdp_desc", 0, [1.0]),
+    _cursor("name_asc", 0, [1, 2]),
+    _cursor("name_asc", 0, ["a", 2]),  # sort mismatch
+    _cursor("gdp_desc", "0", [1.0, 2]),
+])
+def test_malformed_cursor_is_400(listing, cursor):
+    resp = listing.get(f"/countries?sort=gdp_desc&limit=5&cursor={cursor}")
+    assert resp.status_code == 400
+    assert resp.json()["error"] == "Validation failed"
+    assert "cursor" in resp.json()["details"]
+
+def test_unknown_field_is_400(seeded):
+    resp = seeded.get("/countries?fields=name,nope")
+    assert resp.status_code == 400
+    assert "fields" in resp.json()["details"]
+
+def test_limit_out_of_range_is_400(seeded):
+    assert seeded.get("/countries?limit=0").status_code == 400
@@ -0,0 +1,15 @@
+from app import main
+
+def test_module_app_is_built_once_on_first_access(monkeypatch):
+    monkeypatch.delitem(vars(main), "app", raising=False)
+    built = []
+    real = main.create_app
+    monkeypatch.setattr(main, "create_app", lambda: built.append(1) or real())
+
+    assert main.app is main.app
+    assert built == [1]
+
+def test_startup_report(client):
+    resp = client.get("/startup")
+    assert resp.status_code == 200
+    assert resp.json()["import_seconds"] > 0
@@ -0,0 +1,27 @@
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import instrument_engine
+
+def test_metrics_exposition(seeded):
+    resp = seeded.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="POST",route="/countries/refresh",status="200"}' in resp.text
+    assert "db_queries_per_request_count" in resp.text
+
+def test_server_timing_is_opt_in(client, monkeypatch):
+    assert "server-timing" not in client.get("/healthz").headers
+    monkeypatch.setattr(settings, "METRICS_PROFILING_ENABLED", True)
+    assert client.get("/healthz").headers["server-timing"].startswith("db;dur=")
+
+def test_only_queue_pools_get_checkout_timing():
+    queued = create_engine("sqlite://", poolclass=QueuePool)
+    unpooled = create_engine("sqlite://", poolclass=NullPool)
+    instrument_engine(queued)
+    instrument_engine(unpooled)
+    assert "_do_get" in vars(queued.pool)
+    assert "_do_get" not in vars(unpooled.pool)
+    with unpooled.connect() as conn:
+        assert conn.exec_driver_sql("select 1").scalar() == 1
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.clients import external
+from app.core.config import settings
+from app.db import SessionLocal
+from app.models.exchange_rate import ExchangeRate
+from app.services import refresh
+from app.services.meta import get_meta
+from tests.conftest import RATES, make_payload
+
+def _last_refreshed_at():
+    with SessionLocal() as db:
+        return get_meta(db).last_refreshed_at
+
+def _rates_updated_at():
+    with SessionLocal() as db:
+        return dict(db.execute(select(ExchangeRate.code, ExchangeRate.updated_at)).all())
+
+def test_refresh_summary_and_delta(client, upstream):
+    first = client.post("/countries/refresh").json()
+    assert (first["inserted"], first["changed"], first["total"]) == (30, 0, 30)
+    assert first["served_stale"] is False and first["stale_sources"] == []
+
+    upstream.countries = make_payload(31, seed=1)
+    second = client.post("/countries/refresh").json()
+    assert (second["inserted"], second["changed"], second["unchanged"], second["total"]) == (1, 30, 0, 31)
+    assert second["updated"] == 30
+
+    third = client.post("/countries/refresh").json()
+    assert (third["inserted"], third["updated"], third["changed"], third["unchanged"]) == (0, 31, 0, 31)
+
+def test_refresh_async_job(client):
+    accepted = client.post("/countries/refresh?wait=false")
+    assert accepted.status_code == 202
+    job_id = accepted.json()["job_id"]
+    for _ in range(100):
+        job = client.get(f"/countries/refresh/{job_id}")
+        assert job.status_code == 200
+        if job.json()["status"] not in ("pending", "running"):
+            break
+        time.sleep(0.02)
+    assert job.json()["status"] == "succeeded"
+    assert job.json()["result"]["total"] == 30
+    assert client.get("/countries/refresh/nope").status_code == 404
+
+def test_all_sources_stale_does_not_look_fresh(seeded, upstream):
+    refreshed_at, rates_at = _last_refreshed_at(), _rates_updated_at()
+    status_before = seeded.get("/status").json()["last_refreshed_at"]
+
+    upstream.stale_sources = [external.COUNTRIES_SOURCE, external.RATES_SOURCE]
+    upstream.rates = {**RATES, "EUR": 0.5}
+    result = seeded.post("/countries/refresh").json()
+    assert result["served_stale"] is True
+    assert result["last_refreshed_at"] == status_before
+    assert _last_refreshed_at() == refreshed_at
+    assert _rates_updated_at() == rates_at
+    assert seeded.get("/status").json()["last_refreshed_at"] == status_before
+
+def test_one_fresh_source_advances_refresh_time(seeded, upstream):
+    refreshed_at, rates_at = _last_refreshed_at(), _rates_updated_at()
+    upstream.stale_sources = [external.RATES_SOURCE]
+    upstream.rates = {**RATES, "EUR": 0.5}
+    seeded.post("/countries/refresh")
+    assert _last_refreshed_at() > refreshed_at
+    assert _rates_updated_at() == rates_at  # stale rates are not rewritten
+
+class FlakyUpstream:
+    """restcountries/open.er-api stand-in; `down` turns every response into a 503."""
+
+    def __init__(self):
+        self.down = False
+        self.calls = Counter()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls[request.url.path] += 1
+        if self.down:
+            return httpx.Response(503)
+        if request.url.path == "/rates":
+            return httpx.Response(200, json={"result": "success", "rates": RATES})
+        return httpx.Response(200, json=make_payload(5))
+
+@pytest.fixture
+def flaky(client, monkeypatch):
+    upstream = FlakyUpstream()
+    mock = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    monkeypatch.setattr(external, "get_client", lambda: mock)
+    monkeypatch.setattr(refresh, "fetch_countries_and_rates", external.fetch_countries_and_rates)
+    monkeypatch.setattr(settings, "EXTERNAL_COUNTRIES_URL", "http://upstream.test/countries")
+    monkeypatch.setattr(settings, "EXTERNAL_RATES_URL", "http://upstream.test/rates")
+    monkeypatch.setattr(settings, "EXTERNAL_RETRY_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "EXTERNAL_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(settings, "EXTERNAL_BREAKER_THRESHOLD", 1)
+    return upstream
+
+def test_upstream_down_without_fallback_is_503(client, flaky):
+    flaky.down = True
+    resp = client.post("/countries/refresh")
+    assert resp.status_code == 503
+    assert resp.json()["error"] == "External data source unavailable"
+    # The upstream that gave up first was tried twice (the other may still be retrying)
+    failed = "/countries" if external.COUNTRIES_SOURCE in resp.json()["details"] else "/rates"
+    assert flaky.calls[failed] == 2
+
+def test_breaker_opens_and_last_known_good_is_served(client, flaky):
+    assert client.post("/countries/refresh").json()["served_stale"] is False
+    flaky.down = True
+
+    stale = client.post("/countries/refresh").json()
+    assert stale["served_stale"] is True
+    assert sorted(stale["stale_sources"]) == sorted([external.COUNTRIES_SOURCE, external.RATES_SOURCE])
+    assert stale["total"] == 5
+
+    upstreams = client.get("/status").json()["upstreams"]
+    assert upstreams[external.COUNTRIES_SOURCE]["state"] == "open"
+    assert upstreams[external.COUNTRIES_SOURCE]["serving_stale"] is True
+
+    calls = sum(flaky.calls.values())
+    assert client.post("/countries/refresh").json()["served_stale"] is True
+    assert sum(flaky.calls.values()) == calls  # open breaker: no upstream traffic
+
+def test_deadline_overrun_falls_back_to_last_known_good(client, flaky, monkeypatch):
+    assert client.post("/countries/refresh").json()["served_stale"] is False
+
+    async def slow(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(1)
+        return flaky(request)
+
+    mock = httpx.AsyncClient(transport=httpx.MockTransport(slow))
+    monkeypatch.setattr(external, "get_client", lambda: mock)
+    monkeypatch.setattr(settings, "EXTERNAL_RETRY_DEADLINE", 0.05)
+    resp = client.post("/countries/refresh")
+    assert resp.status_code == 200
+    assert resp.json()["served_stale"] is True
+    assert client.get("/status").json()["upstreams"][external.COUNTRIES_SOURCE]["state"] == "open"
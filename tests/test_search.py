@@ -0,0 +1,36 @@
+import pytest
+
+from app.services.search import search_index
+from tests.conftest import make_payload
+
+def test_exact_name_ranks_first(seeded):
+    results = seeded.get("/countries/search?q=country 1").json()
+    assert results[0]["name"] == "Country 1" and results[0]["match"] == "name"
+    assert {r["name"] for r in results[1:]} <= {f"Country 1{i}" for i in range(10)}
+
+def test_capital_and_fuzzy_matches(seeded):
+    assert seeded.get("/countries/search?q=capital 7").json()[0]["match"] == "capital"
+    fuzzy = seeded.get("/countries/search?q=contry 21").json()
+    assert fuzzy and fuzzy[0]["match"] == "fuzzy"
+
+def test_search_follows_deletes(seeded):
+    assert seeded.get("/countries/search?q=country 1&limit=1").json()[0]["name"] == "Country 1"
+    assert seeded.delete("/countries/Country 1").status_code == 204
+    assert "Country 1" not in [r["name"] for r in seeded.get("/countries/search?q=country 1").json()]
+
+@pytest.mark.parametrize("query", ["", "q=", "q=x&limit=0", "q=x&limit=51", "q=" + "x" * 101])
+def test_search_rejects_bad_query(seeded, query):
+    resp = seeded.get(f"/countries/search?{query}")
+    assert resp.status_code == 400
+    assert resp.json()["error"] == "Validation failed"
+
+def test_refresh_patches_warm_index_with_written_rows(seeded, upstream):
+    assert seeded.get("/countries/search?q=country").status_code == 200  # builds the index
+    generation = search_index.generation
+    upstream.countries = make_payload(31)
+    upstream.countries[1] = {**upstream.countries[1], "capital": "Newtown"}
+    assert seeded.post("/countries/refresh").json()["changed"] == 1
+
+    assert search_index.generation > generation  # patched in place, not rebuilt
+    assert seeded.get("/countries/search?q=country 30").json()[0]["name"] == "Country 30"
+    assert seeded.get("/countries/search?q=newtown").json()[0]["name"] == "Country 1"
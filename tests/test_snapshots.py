@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.db import SessionLocal
+from app.models.country import Country
+from app.models.snapshot import CountrySnapshot, RefreshRun
+from app.services.meta import bump_generation
+from app.services.snapshots import compact_snapshots, record_snapshots
+from tests.conftest import make_payload
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _names(client, **params) -> set:
+    resp = client.get("/countries", params=params)
+    assert resp.status_code == 200, resp.text
+    return {c["name"] for c in resp.json()}
+
+def test_as_of_keeps_countries_deleted_later(seeded):
+    before = _now()
+    victim = seeded.get("/countries?limit=1").json()[0]
+    assert seeded.delete(f"/countries/{victim['name']}").status_code == 204
+
+    assert victim["name"] in _names(seeded, as_of=before)
+    assert len(_names(seeded, as_of=before)) == 30
+    assert victim["name"] not in _names(seeded, as_of=_now())
+
+def test_as_of_region_uses_captured_region(seeded):
+    before = _now()
+    name = seeded.get("/countries?region=Asia&limit=1").json()[0]["name"]
+    patched = seeded.patch("/countries/batch", json={"update": [{"name": name, "region": "Europe"}]})
+    assert patched.status_code == 200, patched.text
+    assert name in _names(seeded, as_of=before, region="asia")
+    assert name not in _names(seeded, as_of=before, region="europe")
+
+def test_as_of_before_first_refresh_is_empty(seeded):
+    assert _names(seeded, as_of="2000-01-01T00:00:00Z") == set()
+
+def test_as_of_rejects_pagination(seeded):
+    resp = seeded.get("/countries", params={"as_of": _now(), "limit": 5})
+    assert resp.status_code == 400
+    assert "as_of" in resp.json()["details"]
+
+def test_history_grows_with_changes(seeded, upstream):
+    name = make_payload()[0]["name"]
+    assert len(seeded.get(f"/countries/{name}/history").json()) == 1
+
+    upstream.countries = make_payload(seed=1)
+    seeded.post("/countries/refresh")
+    history = seeded.get(f"/countries/{name}/history").json()
+    assert [h["population"] for h in history] == [1000, 1001]
+
+def test_history_rejects_bad_range_and_unknown_country(seeded):
+    name = make_payload()[0]["name"]
+    resp = seeded.get(f"/countries/{name}/history", params={"from": "2026-02-01T00:00:00Z", "to": "2026-01-01T00:00:00Z"})
+    assert resp.status_code == 400
+    assert seeded.get("/countries/Atlantis/history").status_code == 404
+
+def _snapshot_days(db) -> list:
+    rows = db.execute(select(CountrySnapshot.captured_at).order_by(CountrySnapshot.captured_at)).scalars().all()
+    return [r.replace(tzinfo=timezone.utc) for r in rows]
+
+def test_compaction_works_off_old_backlog_in_batches(client, monkeypatch):
+    monkeypatch.setattr(settings, "SNAPSHOT_FULL_RETENTION_DAYS", 30)
+    monkeypatch.setattr(settings, "SNAPSHOT_COMPACTION_BATCH_SIZE", 4)
+    monkeypatch.setattr(settings, "SNAPSHOT_MAX_RETENTION_DAYS", 0)
+    now = datetime(2026, 6, 1, 12, tzinfo=timezone.utc)
+    # Three snapshots a day, far past any fixed window, plus one recent day
+    days = [now - timedelta(days=d) for d in (400, 200, 90, 45, 2)]
+    with SessionLocal() as db, db.begin():
+        bump_generation(db)
+        run = RefreshRun(refreshed_at=now, inserted=0, changed=0)
+        db.add(run)
+        db.flush()
+        db.add_all(
+            CountrySnapshot(refresh_id=run.id, country_id=1, captured_at=day + timedelta(hours=h), population=h)
+            for day in days for h in (0, 1, 2)
+        )
+
+    compacted = []
+    with SessionLocal() as db:
+        for _ in range(6):
+            with db.begin():
+                compacted.append(compact_snapshots(db, now))
+        remaining = _snapshot_days(db)
+
+    assert compacted[:4] == [2, 2, 2, 2] and sum(compacted) == 8
+    old = [t for t in remaining if t < now - timedelta(days=30)]
+    assert len(old) == 4 and all(t.hour == days[0].hour + 2 for t in old)  # last of each day
+    assert len(remaining) == 4 + 3  # the recent day is untouched
+
+def test_expiry_keeps_each_live_countrys_latest_snapshot(seeded, upstream, monkeypatch):
+    upstream.countries = make_payload(seed=1)
+    seeded.post("/countries/refresh")
+    assert seeded.delete("/countries/Country 0").status_code == 204
+
+    monkeypatch.setattr(settings, "SNAPSHOT_MAX_RETENTION_DAYS", 90)
+    later = datetime.now(timezone.utc) + timedelta(days=400)
+    with SessionLocal() as db, db.begin():
+        # The superseded first round, plus all of deleted Country 0 (snapshot + tombstone)
+        assert compact_snapshots(db, later) == 30 + 2
+    with SessionLocal() as db:
+        assert len(_snapshot_days(db)) == 29
+        assert db.scalar(select(func.count()).select_from(RefreshRun)) == 1
+
+    as_of = _names(seeded, as_of=later.isoformat())
+    assert len(as_of) == 29 and "Country 0" not in as_of
+    assert [h["population"] for h in seeded.get("/countries/Country 1/history").json()] == [1038]
+
+def test_snapshots_are_picked_by_id_not_timestamp(seeded):
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db, db.begin():
+        # As stored by a DATETIME(0) column: the microseconds are gone
+        db.execute(update(Country).values(last_refreshed_at=now.replace(microsecond=0) - timedelta(seconds=1)))
+        ids = db.execute(select(Country.id).limit(3)).scalars().all()
+        record_snapshots(db, ids, now)
+    with SessionLocal() as db:
+        captured = db.execute(select(CountrySnapshot.country_id).where(CountrySnapshot.captured_at == now)).scalars().all()
+    assert sorted(captured) == sorted(ids)
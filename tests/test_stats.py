@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import delete
+
+from app.db import SessionLocal
+from app.models.aggregate import CountryAggregate
+from app.services.aggregates import summary_from_aggregates
+from app.services.cache import data_changed
+
+def test_stats_by_region(seeded):
+    resp = seeded.get("/countries/stats?top=2")
+    assert resp.status_code == 200
+    stats = {s["group"]: s for s in resp.json()}
+    assert set(stats) == {"Africa", "Europe", "Asia"}
+    assert sum(s["count"] for s in stats.values()) == 30
+    for s in stats.values():
+        assert len(s["top"]) == 2
+        assert s["top"][0]["estimated_gdp"] >= s["top"][1]["estimated_gdp"]
+        assert s["top"][0]["estimated_gdp"] == s["gdp_max"]
+
+def test_stats_follow_deletes(seeded):
+    before = {s["group"]: s["count"] for s in seeded.get("/countries/stats?group_by=currency").json()}
+    assert seeded.delete("/countries/Country 0").status_code == 204  # a USD country
+    after = {s["group"]: s["count"] for s in seeded.get("/countries/stats?group_by=currency").json()}
+    assert after == {**before, "USD": before["USD"] - 1}
+
+@pytest.mark.parametrize("query", ["group_by=capital", "top=-1", "top=1000"])
+def test_stats_rejects_bad_query(seeded, query):
+    resp = seeded.get(f"/countries/stats?{query}")
+    assert resp.status_code == 400
+    assert resp.json()["error"] == "Validation failed"
+
+def test_unchanged_refresh_builds_missing_rollup(seeded):
+    with SessionLocal() as db, db.begin():
+        db.execute(delete(CountryAggregate))  # as after upgrading to the aggregates revision
+    data_changed()
+    assert seeded.get("/countries/stats").json() == []
+    assert seeded.post("/countries/refresh").json()["changed"] == 0
+
+    stats = seeded.get("/countries/stats").json()
+    assert sum(s["count"] for s in stats) == 30
+    with SessionLocal() as db:
+        assert summary_from_aggregates(db)[0] == 30